@@ -1,9 +1,13 @@
-import pandas as pd
+import os
+import sys
 
-df = pd.read_csv('../data_vtv/processed/all_vtv.csv')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from mmap_corpus import MmapCorpus
+
+# Kho mmap do preprocess_data ghi ra: chỉ đọc trường content, không nạp cả bộ dữ liệu vào pandas
+corpus = MmapCorpus('../data_vtv/processed/vtv_article_corpus')
 cnt = 0
-for i in range(len(df)):
-    original_content = df.at[i, 'content']
+for i, original_content in enumerate(corpus.iter_field('content')):
     # Ví dụ: thêm dấu chấm than
     text = original_content
 
@@ -14,3 +18,4 @@ for i in range(len(df)):
         if len(sentence.split()) > 218:
             print(f'hàng {i} có cau > 218 chữ')
             print(len(sentence))
+corpus.close()
@@ -69,8 +69,24 @@ def demoTakeLinkPerPage(url):
     return list(set(links))  # Loại trùng
 
 
+def demoTakeLinkPerPageHttp(url, max_pages=20):
+    # Giống demoTakeLinkPerPage nhưng không cần trình duyệt: tải trực tiếp các trang timeline "Xem thêm"
+    import requests
+    from vtv_timeline import VtvTimelineFetcher
+
+    session = requests.Session()
+    fetcher = VtvTimelineFetcher(lambda timeline_url: session.get(timeline_url, timeout=15))
+    response = session.get(url, timeout=15)
+    response.encoding = 'utf-8'
+    links = fetcher.collect(response.text, max_pages=max_pages)
+    if links is None:
+        # Trang không có timeline đọc được bằng HTTP, quay lại dùng selenium
+        return demoTakeLinkPerPage(url)
+    return links
+
+
 if __name__ == '__main__':
     # unique_links = craw_links_per_page_of_vneconomy(requests.get('https://vneconomy.vn/dia-oc.htm?trang=27'))
-    unique_links = demoTakeLinkPerPage("https://vtv.vn/chinh-tri.htm")
+    unique_links = demoTakeLinkPerPageHttp("https://vtv.vn/chinh-tri.htm")
     print(len(unique_links))
     print(*unique_links, sep='\n')
@@ -0,0 +1,265 @@
+import argparse
+import sqlite3
+import threading
+import time
+
+from crawl_frontier import url_hash
+from dataset_io import BatchWriter
+from raw_store import RawStore
+
+METADATA_COLUMNS = ['url', 'source', 'category', 'title', 'pub_date', 'scraped_at', 'summary_words', 'content_words',
+                    'processed']
+TEXT_COLUMNS = ['title', 'summary', 'content']
+
+
+class ArticleCatalog:
+    """
+    Danh mục bài viết trong SQLite: siêu dữ liệu (url, nguồn, chuyên mục, thời gian, độ dài) trong bảng `articles`
+    có chỉ mục theo nguồn/chuyên mục/thời gian, và chỉ mục toàn văn FTS5 trên tiêu đề, tóm tắt, nội dung.
+    Lọc và tìm kiếm bài viết chỉ chạm tới các dòng khớp, không phải đọc lại toàn bộ dữ liệu thô hay file đã xử lý.
+    Scraper thêm bài ngay khi bài đã được ghi bền vào kho raw; tiền xử lý bổ sung các bài còn thiếu và đánh dấu
+    các bài được giữ lại trong bộ dữ liệu đã xử lý.
+    """
+
+    def __init__(self, db_path, commit_every=500):
+        self.db_path = db_path
+        self.commit_every = commit_every
+        self._lock = threading.Lock()
+        self._uncommitted = 0
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS articles (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url_hash INTEGER NOT NULL UNIQUE,
+                url TEXT NOT NULL,
+                source TEXT,
+                category TEXT,
+                title TEXT,
+                pub_date TEXT,
+                scraped_at TEXT,
+                summary_words INTEGER NOT NULL DEFAULT 0,
+                content_words INTEGER NOT NULL DEFAULT 0,
+                processed INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        # Giữ nguyên dấu tiếng Việt khi tách từ: "bà" và "ba" là hai từ khác nhau
+        self.conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+                title, summary, content, tokenize = 'unicode61 remove_diacritics 0'
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_source ON articles (source, category)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_scraped ON articles (scraped_at)")
+        self.conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def __contains__(self, url):
+        with self._lock:
+            return self.conn.execute("SELECT 1 FROM articles WHERE url_hash = ?", (url_hash(url),)).fetchone() is not None
+
+    def add(self, article, overwrite=True):
+        """
+        Thêm hoặc cập nhật một bài viết (dict như trong kho raw).
+        overwrite=False bỏ qua bài đã có trong danh mục, dùng khi bổ sung từ dữ liệu cũ.
+        Trả về True nếu bài được ghi.
+        """
+        url = article.get('url')
+        if not url:
+            return False
+        h = url_hash(url)
+        title, summary, content = (article.get(column) or '' for column in TEXT_COLUMNS)
+        metadata = (url, article.get('source'), article.get('category'), title or None, article.get('pub_date') or None,
+                    article.get('scraped_at'), len(summary.split()), len(content.split()))
+        with self._lock:
+            row = self.conn.execute("SELECT id FROM articles WHERE url_hash = ?", (h,)).fetchone()
+            if row is not None and not overwrite:
+                return False
+            if row is None:
+                cursor = self.conn.execute(
+                    "INSERT INTO articles (url, source, category, title, pub_date, scraped_at, summary_words, "
+                    "content_words, url_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    metadata + (h,)
+                )
+                article_id = cursor.lastrowid
+            else:
+                article_id = row[0]
+                self.conn.execute(
+                    "UPDATE articles SET url = ?, source = ?, category = ?, title = ?, pub_date = ?, scraped_at = ?, "
+                    "summary_words = ?, content_words = ? WHERE id = ?",
+                    metadata + (article_id,)
+                )
+                self.conn.execute("DELETE FROM articles_fts WHERE rowid = ?", (article_id,))
+            self.conn.execute("INSERT INTO articles_fts (rowid, title, summary, content) VALUES (?, ?, ?, ?)",
+                              (article_id, title, summary, content))
+            self._maybe_commit()
+        return True
+
+    def reset_processed(self, source=None):
+        """
+        Bỏ đánh dấu đã xử lý của mọi bài (hoặc mọi bài của một nguồn, khi nhiều nguồn dùng chung danh mục),
+        gọi trước khi tiền xử lý lại toàn bộ dữ liệu
+        """
+        with self._lock:
+            if source:
+                self.conn.execute("UPDATE articles SET processed = 0 WHERE processed != 0 AND source = ?", (source,))
+            else:
+                self.conn.execute("UPDATE articles SET processed = 0 WHERE processed != 0")
+            self._maybe_commit()
+
+    def mark_processed(self, url, processed=True):
+        """
+        Đánh dấu bài viết có mặt trong bộ dữ liệu đã xử lý (qua bước làm sạch và lọc trùng).
+        processed=False bỏ đánh dấu, khi bản mới của bài không còn được giữ lại.
+        """
+        with self._lock:
+            self.conn.execute("UPDATE articles SET processed = ? WHERE url_hash = ?",
+                              (1 if processed else 0, url_hash(url)))
+            self._maybe_commit()
+
+    def _build_query(self, columns, text=None, source=None, category=None, since=None, until=None,
+                     min_words=None, max_words=None, processed=None, limit=None, join_text=False, order=True):
+        query = f"SELECT {', '.join(columns)} FROM articles a"
+        conditions = []
+        params = []
+        if text or join_text:
+            query += " JOIN articles_fts ON articles_fts.rowid = a.id"
+        if text:
+            # Cú pháp truy vấn FTS5: "cụm từ chính xác", từ AND từ, từ OR từ, NOT, tiền tố*
+            conditions.append("articles_fts MATCH ?")
+            params.append(text)
+        for column, value in (('source', source), ('category', category)):
+            if value:
+                conditions.append(f"a.{column} = ?")
+                params.append(value)
+        if since:
+            conditions.append("a.scraped_at >= ?")
+            params.append(since)
+        if until:
+            # until (YYYY-MM-DD) tính cả ngày đó
+            conditions.append("substr(a.scraped_at, 1, ?) <= ?")
+            params.extend([len(until), until])
+        if min_words is not None:
+            conditions.append("a.content_words >= ?")
+            params.append(min_words)
+        if max_words is not None:
+            conditions.append("a.content_words <= ?")
+            params.append(max_words)
+        if processed is not None:
+            conditions.append("a.processed = ?")
+            params.append(1 if processed else 0)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        if order:
+            query += " ORDER BY articles_fts.rank" if text else " ORDER BY a.id"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        return query, params
+
+    def search(self, text=None, **filters):
+        """
+        Tìm bài viết theo từ khoá (FTS5, xếp theo độ liên quan) và/hoặc bộ lọc: source, category,
+        since/until (theo scraped_at, dạng YYYY-MM-DD), min_words/max_words (số từ của nội dung), processed, limit.
+        Trả về danh sách dict siêu dữ liệu, không kèm nội dung.
+        """
+        columns = [f"a.{column}" for column in METADATA_COLUMNS]
+        query, params = self._build_query(columns, text=text, **filters)
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return [dict(zip(METADATA_COLUMNS, row)) for row in rows]
+
+    def count(self, text=None, **filters):
+        query, params = self._build_query(['COUNT(*)'], text=text, order=False, **filters)
+        with self._lock:
+            return self.conn.execute(query, params).fetchone()[0]
+
+    def export(self, path, text=None, batch_size=1000, **filters):
+        """
+        Xuất các bài khớp điều kiện (như search) kèm tiêu đề, tóm tắt, nội dung ra file .parquet/.csv, đọc theo từng lô
+        từ SQLite nên bộ nhớ không phụ thuộc số bài. Trả về số bài đã xuất.
+        """
+        columns = [f"a.{column}" for column in METADATA_COLUMNS if column != 'title']
+        columns += [f"articles_fts.{column}" for column in TEXT_COLUMNS]
+        names = [column.split('.', 1)[1] for column in columns]
+        query, params = self._build_query(columns, text=text, join_text=True, **filters)
+        # Kết nối riêng để việc xuất dài không giữ khoá của kết nối ghi
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            cursor = conn.execute(query, params)
+            with BatchWriter(path, batch_size=batch_size) as writer:
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        writer.write(dict(zip(names, row)))
+        finally:
+            conn.close()
+        return writer.count
+
+    def _maybe_commit(self):
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self.conn.commit()
+            self._uncommitted = 0
+
+    def commit(self):
+        with self._lock:
+            self.conn.commit()
+            self._uncommitted = 0
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+
+def build_catalog(raw_dir, db_path):
+    """Bổ sung vào danh mục mọi bài viết trong kho raw còn thiếu. Trả về số bài đã thêm"""
+    catalog = ArticleCatalog(db_path)
+    added = sum(1 for article in RawStore(raw_dir).iter_articles() if catalog.add(article, overwrite=False))
+    catalog.close()
+    return added
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Danh mục bài viết SQLite với chỉ mục toàn văn FTS5")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build_parser = subparsers.add_parser('build', help="Bổ sung danh mục từ kho raw")
+    build_parser.add_argument('raw_dir', help="Thư mục raw, ví dụ data_vtv/raw")
+    build_parser.add_argument('db_path', help="File danh mục, ví dụ data_vtv/catalog.sqlite3")
+    query_parser = subparsers.add_parser('query', help="Tìm bài viết, in danh sách hoặc xuất ra file")
+    query_parser.add_argument('db_path', help="File danh mục")
+    query_parser.add_argument('--text', default=None, help="Truy vấn toàn văn FTS5, ví dụ '\"lãi suất\" AND ngân hàng'")
+    query_parser.add_argument('--source', default=None)
+    query_parser.add_argument('--category', default=None)
+    query_parser.add_argument('--since', default=None, help="Từ ngày thu thập (YYYY-MM-DD)")
+    query_parser.add_argument('--until', default=None, help="Tới hết ngày thu thập (YYYY-MM-DD)")
+    query_parser.add_argument('--min-words', type=int, default=None, help="Số từ tối thiểu của nội dung")
+    query_parser.add_argument('--max-words', type=int, default=None, help="Số từ tối đa của nội dung")
+    query_parser.add_argument('--processed', action='store_true', help="Chỉ các bài có trong bộ dữ liệu đã xử lý")
+    query_parser.add_argument('--limit', type=int, default=None)
+    query_parser.add_argument('--export', default=None, help="Xuất kèm nội dung ra file .parquet/.csv thay vì in")
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        print(f"Đã thêm {build_catalog(args.raw_dir, args.db_path)} bài viết vào {args.db_path}")
+    else:
+        catalog = ArticleCatalog(args.db_path)
+        filters = dict(source=args.source, category=args.category, since=args.since, until=args.until,
+                       min_words=args.min_words, max_words=args.max_words, processed=True if args.processed else None,
+                       limit=args.limit)
+        start_time = time.perf_counter()
+        if args.export:
+            count = catalog.export(args.export, text=args.text, **filters)
+            print(f"Đã xuất {count} bài viết ra {args.export} trong {time.perf_counter() - start_time:.3f} giây")
+        else:
+            for article in catalog.search(text=args.text, **filters):
+                print(f"{article['scraped_at']}  {article['source']}/{article['category']}  "
+                      f"{article['content_words']} từ  {article['url']}")
+            print(f"({time.perf_counter() - start_time:.3f} giây)")
+        catalog.close()
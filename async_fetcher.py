@@ -0,0 +1,327 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from tqdm import tqdm
+
+from rate_limiter import AdaptiveRateLimiter
+from retry_policy import OK, PERMANENT, TRANSIENT, CircuitBreaker, RetryPolicy
+
+
+class AsyncFetcher:
+    """Tải song song nhiều trang bài viết bằng asyncio, giới hạn số request đồng thời trên mỗi host"""
+
+    def __init__(self, session, headers, max_per_host=4, max_concurrency=32, timeout=15, max_retries=3,
+                 rate_limiter=None, parse_workers=None, queue_size=64, archive=None, retry_policy=None,
+                 circuit_breaker=None, article_deadline=60, hedge_requests=False):
+        self.session = session
+        self.headers = headers
+        # Bộ giới hạn tốc độ dùng chung với phần thu thập trang danh sách
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        self.max_per_host = max_per_host
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        # Tổng thời gian tối đa dành cho một bài viết, tính từ lần gửi đầu tiên, gồm cả các lần thử lại và backoff
+        self.article_deadline = article_deadline
+        # Hedging: request chưa có trả lời sau p95 độ trễ của host thì gửi thêm một bản sao, lấy bản về trước
+        self.hedge_requests = hedge_requests
+        self._latencies = {}
+        # Chính sách thử lại và cầu dao theo host, nên dùng chung với phần tải trang danh sách của scraper
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=max_retries)
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        # Số tiến trình trích xuất HTML: None = số nhân CPU, 0 = trích xuất bằng thread trong cùng tiến trình
+        self.parse_workers = (os.cpu_count() or 1) if parse_workers is None else parse_workers
+        # Số trang HTML tối đa chờ trích xuất; đầy thì bước tải tạm dừng thay vì giữ HTML đầy bộ nhớ
+        self.queue_size = queue_size
+        # Kho HTML thô (HtmlArchive): mọi trang tải qua mạng được lưu lại để trích xuất lại mà không cần tải lại
+        self.archive = archive
+        self._host_slots = {}
+        self._global_slots = None
+        self._unresolved = 0
+        self._number_of_fetchers = 0
+        self.stats = {}
+
+    def fetch_all(self, article_links, extract, on_article, desc="Thu thập bài viết", on_failure=None, executor=None):
+        """
+        Tải và trích xuất toàn bộ các liên kết, trả về số bài viết thu thập được.
+        Args:
+            article_links (list): Danh sách dict có 'url' và 'category'.
+            extract (callable): Hàm extract(html, url, category) -> dict hoặc None, phải là hàm cấp module
+                                (pickle được) khi trích xuất bằng nhiều tiến trình.
+            on_article (callable): Hàm được gọi với mỗi bài viết trích xuất thành công.
+            desc (str): Nhãn cho thanh tiến trình.
+            on_failure (callable): Hàm on_failure(article_info, outcome) được gọi với mỗi liên kết không tải được;
+                                   outcome là PERMANENT (404, 410...) hoặc TRANSIENT (đã hết lượt thử lại).
+            executor (ProcessPoolExecutor): Pool trích xuất của bên gọi, dùng lại qua nhiều lần gọi fetch_all
+                                            (ví dụ CrawlWorker gọi theo từng lô nhỏ); None thì tự tạo pool
+                                            parse_workers tiến trình cho lần gọi này.
+        """
+        if not article_links:
+            return 0
+        self.stats = {'transient_errors': 0, 'permanent_errors': 0, 'gave_up': 0, 'parked': 0,
+                      'deadline_exceeded': 0, 'hedged': 0, 'hedge_won': 0}
+        if executor is not None:
+            claimed = asyncio.run(self._run(article_links, extract, on_article, desc, executor, on_failure))
+        elif self.parse_workers <= 0:
+            claimed = asyncio.run(self._run(article_links, extract, on_article, desc, None, on_failure))
+        else:
+            # BeautifulSoup giữ GIL, nên việc phân tích HTML được đẩy sang các tiến trình riêng để chạy song song
+            # với việc tải trang
+            with ProcessPoolExecutor(max_workers=self.parse_workers) as executor:
+                claimed = asyncio.run(self._run(article_links, extract, on_article, desc, executor, on_failure))
+        logging.info(f"Thống kê lỗi tải: {self.stats}, thử lại: {self.retry_policy.stats()}, "
+                     f"số lần ngắt cầu dao: {self.circuit_breaker.trips}")
+        return claimed
+
+    async def _run(self, article_links, extract, on_article, desc, executor, on_failure):
+        # Semaphore và hàng đợi phải được tạo bên trong event loop đang chạy
+        self._host_slots = {}
+        self._global_slots = asyncio.Semaphore(self.max_concurrency)
+        # Mỗi phần tử là (liên kết, số thứ tự lần thử, hạn chót của bài viết); lần thử lại được đưa lại vào hàng đợi
+        # sau thời gian backoff. Hạn chót được đặt khi request đầu tiên thực sự được gửi.
+        links = asyncio.Queue()
+        for article_info in article_links:
+            links.put_nowait((article_info, 1, None))
+        self._unresolved = len(article_links)
+        self._number_of_fetchers = min(self.max_concurrency, len(article_links))
+        pages = asyncio.Queue(maxsize=self.queue_size)
+        claimed = [0]
+
+        with tqdm(total=len(article_links), desc=desc) as progress:
+            fetchers = [asyncio.create_task(self._fetch_stage(links, pages, progress, on_failure))
+                        for _ in range(self._number_of_fetchers)]
+            # Mỗi tiến trình trích xuất luôn có sẵn trang tiếp theo trong khi kết quả trang trước đang được lưu
+            number_of_parsers = self.parse_workers * 2 if executor is not None else 4
+            parsers = [asyncio.create_task(self._extract_stage(pages, extract, on_article, executor, progress, claimed))
+                       for _ in range(number_of_parsers)]
+            await asyncio.gather(*fetchers)
+            # Báo cho bước trích xuất là không còn trang nào nữa
+            for _ in parsers:
+                await pages.put(None)
+            await asyncio.gather(*parsers)
+        return claimed[0]
+
+    async def _fetch_stage(self, links, pages, progress, on_failure):
+        """
+        Bước tải: lấy liên kết từ hàng đợi, tải HTML rồi chuyển sang hàng đợi trích xuất.
+        Lỗi tạm thời không được thử lại ngay tại chỗ mà hẹn giờ đưa lại vào hàng đợi, nên trong lúc chờ backoff
+        hoặc chờ cầu dao của một host, worker vẫn tiếp tục tải liên kết của các host khác.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await links.get()
+            if item is None:
+                return
+            article_info, attempt, deadline = item
+            url = article_info['url']
+            cached = self._is_cached(url)
+            if not cached:
+                if self.circuit_breaker.is_down(url):
+                    self._give_up(article_info, TRANSIENT, links, progress, on_failure)
+                    continue
+                if deadline is not None and time.monotonic() >= deadline:
+                    self.stats['deadline_exceeded'] += 1
+                    self._give_up(article_info, TRANSIENT, links, progress, on_failure)
+                    continue
+                wait = self.circuit_breaker.wait_time(url)
+                if wait > 0:
+                    # Host đang bị ngắt: gác liên kết lại tới khi hết thời gian ngắt
+                    self.stats['parked'] += 1
+                    loop.call_later(wait, links.put_nowait, item)
+                    continue
+                if attempt == 1:
+                    self.retry_policy.record_request()
+                if deadline is None:
+                    deadline = time.monotonic() + self.article_deadline
+            # Mỗi lần thử không được vượt quá phần thời gian còn lại của bài viết
+            timeout = self.timeout if deadline is None else max(0.5, min(self.timeout, deadline - time.monotonic()))
+
+            html = None
+            retry_after = None
+            try:
+                html, status_code, retry_after = await self._fetch(url, article_info.get('source'),
+                                                                   article_info.get('category'), timeout)
+                outcome = self.retry_policy.classify(status_code)
+                if outcome != OK:
+                    logging.warning(f"Không thể truy cập {url}, mã trạng thái: {status_code}")
+            except requests.exceptions.RequestException as e:
+                status_code = None
+                outcome = self.retry_policy.classify(exc=e)
+                logging.warning(f"Lỗi kết nối khi thu thập bài viết (lần {attempt}/{self.retry_policy.max_attempts}): "
+                                f"{url} ({type(e).__name__})")
+            except Exception as e:
+                logging.error(f"Lỗi khi thu thập bài viết từ {url}: {str(e)}")
+                status_code = None
+                outcome = PERMANENT
+
+            if not cached:
+                if outcome == TRANSIENT:
+                    self.circuit_breaker.record_failure(url)
+                elif status_code is not None:
+                    self.circuit_breaker.record_success(url)
+
+            if outcome == OK:
+                self._resolve(links)
+                await pages.put((article_info, html))
+                continue
+            if outcome == TRANSIENT:
+                self.stats['transient_errors'] += 1
+                delay = self.retry_policy.backoff(attempt, retry_after)
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    self.stats['deadline_exceeded'] += 1
+                    logging.error(f"Hết thời gian dành cho bài viết sau {attempt} lần thử: {url}")
+                    self._give_up(article_info, outcome, links, progress, on_failure)
+                    continue
+                if self.retry_policy.allow_retry(attempt):
+                    loop.call_later(delay, links.put_nowait, (article_info, attempt + 1, deadline))
+                    continue
+                logging.error(f"Lỗi khi thu thập bài viết sau {attempt} lần thử: {url}")
+            else:
+                # 404, 410...: tải lại cũng không khác, không tốn lượt thử lại
+                self.stats['permanent_errors'] += 1
+            self._give_up(article_info, outcome, links, progress, on_failure)
+
+    def _give_up(self, article_info, outcome, links, progress, on_failure):
+        """Kết thúc một liên kết không tải được"""
+        if outcome == TRANSIENT:
+            self.stats['gave_up'] += 1
+        progress.update(1)
+        self._resolve(links)
+        if on_failure is not None:
+            try:
+                on_failure(article_info, outcome)
+            except Exception as e:
+                logging.error(f"Lỗi khi ghi nhận liên kết lỗi {article_info['url']}: {str(e)}")
+
+    def _resolve(self, links):
+        """Một liên kết đã có kết quả cuối cùng; khi không còn liên kết nào (kể cả đang chờ thử lại) thì dừng bước tải"""
+        self._unresolved -= 1
+        if self._unresolved == 0:
+            for _ in range(self._number_of_fetchers):
+                links.put_nowait(None)
+
+    async def _extract_stage(self, pages, extract, on_article, executor, progress, claimed):
+        """Bước trích xuất: phân tích HTML trong process pool (hoặc thread), lưu bài viết trong event loop"""
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await pages.get()
+            if item is None:
+                return
+            article_info, html = item
+            url = article_info['url']
+            try:
+                article_data = await loop.run_in_executor(executor, extract, html, url, article_info['category'])
+            except Exception as e:
+                logging.error(f"Lỗi khi trích xuất bài viết từ {url}: {str(e)}")
+                article_data = None
+            progress.update(1)
+            if article_data:
+                claimed[0] += 1
+                try:
+                    on_article(article_data)
+                except Exception as e:
+                    logging.error(f"Lỗi khi lưu bài viết {article_data.get('url')}: {str(e)}")
+
+    def _slots_for(self, url):
+        host = urlparse(url).netloc
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self.max_per_host)
+        return self._host_slots[host]
+
+    def _is_cached(self, url):
+        is_fresh = getattr(self.session, 'is_fresh', None)
+        return is_fresh is not None and is_fresh(url)
+
+    async def _fetch(self, url, source=None, category=None, timeout=None):
+        """
+        Tải một trang (một lần thử, việc thử lại do _fetch_stage quyết định).
+        Returns:
+            tuple: (HTML hoặc None nếu mã trạng thái khác 200, mã trạng thái, header Retry-After)
+        """
+        timeout = timeout or self.timeout
+        if self._is_cached(url):
+            # Trang còn hạn trong cache: không chiếm lượt của host, không qua rate limiter
+            response = await asyncio.to_thread(self.session.get, url, headers=self.headers, timeout=timeout)
+            response.encoding = 'utf-8'
+            return response.text, response.status_code, None
+        async with self._global_slots, self._slots_for(url):
+            # Nhịp gửi request do rate limiter quyết định, kể cả khi thử lại
+            await self.rate_limiter.acquire_async(url)
+            response = await self._send(url, timeout)
+        if response.status_code != 200:
+            return None, response.status_code, response.headers.get('Retry-After')
+        response.encoding = 'utf-8'  # Đảm bảo encoding đúng
+        if self.archive is not None and not getattr(response, 'from_cache', False):
+            # Trang từ cache đã được lưu vào kho ở lần tải trước qua mạng
+            await asyncio.to_thread(self.archive.append, url, response.text, source, category)
+        return response.text, response.status_code, None
+
+    async def _send(self, url, timeout):
+        """
+        Gửi GET và ghi nhận kết quả vào rate limiter. Khi bật hedging và host đã có đủ mẫu độ trễ, request chưa trả lời
+        sau p95 độ trễ của host sẽ có thêm một bản sao (nếu ngay lúc đó host còn lượt trống và rate limiter còn token),
+        lấy bản nào về trước. Bản chậm hơn vẫn chạy nốt trong thread của nó, kết quả bị bỏ qua.
+        Bản sao chiếm một lượt riêng của host cho tới khi cả hai request đều xong, nên số request đang chạy tới một host
+        không bao giờ vượt max_per_host.
+        """
+        start = time.monotonic()
+        first = asyncio.ensure_future(
+            asyncio.to_thread(self.session.get, url, headers=self.headers, timeout=timeout))
+        tasks = {first}
+        hedge_delay = self._hedge_delay(url) if self.hedge_requests else None
+        if hedge_delay is not None and hedge_delay < timeout:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            host_slots = self._slots_for(url)
+            if (not done and not host_slots.locked() and not self._global_slots.locked()
+                    and self.rate_limiter.try_acquire(url)):
+                # Semaphore còn chỗ nên acquire trả về ngay, không nhường event loop giữa lúc kiểm tra và lúc lấy
+                await host_slots.acquire()
+                await self._global_slots.acquire()
+                self.stats['hedged'] += 1
+                hedge = asyncio.ensure_future(
+                    asyncio.to_thread(self.session.get, url, headers=self.headers, timeout=timeout - hedge_delay))
+                tasks.add(hedge)
+                # Lượt của bản sao được trả khi cả hai request đều xong: lượt của request gốc được _fetch trả ngay khi
+                # có kết quả, request thua vẫn đang chạy thì dùng lượt này
+                both = asyncio.gather(first, hedge, return_exceptions=True)
+                both.add_done_callback(lambda _: (host_slots.release(), self._global_slots.release()))
+
+        error = None
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    error = task.exception()
+                    continue
+                response = task.result()
+                latency = time.monotonic() - start
+                if task is not first:
+                    self.stats['hedge_won'] += 1
+                for other in tasks:
+                    other.add_done_callback(_discard_result)
+                if response.status_code == 200:
+                    self._latencies.setdefault(urlparse(url).netloc, deque(maxlen=200)).append(latency)
+                self.rate_limiter.record(url, response.status_code, latency, response.headers.get('Retry-After'))
+                return response
+        self.rate_limiter.record(url, None, time.monotonic() - start)
+        raise error
+
+    def _hedge_delay(self, url):
+        """p95 độ trễ của các lần tải thành công gần đây của host, None khi chưa đủ mẫu"""
+        samples = self._latencies.get(urlparse(url).netloc)
+        if not samples or len(samples) < 20:
+            return None
+        ordered = sorted(samples)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+
+def _discard_result(task):
+    # Đọc lỗi của bản request bị bỏ để asyncio không cảnh báo "exception was never retrieved"
+    if not task.cancelled():
+        task.exception()
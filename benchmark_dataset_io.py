@@ -0,0 +1,74 @@
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from dataset_io import CSV_SUFFIX, PARQUET_SUFFIX, pq, read_dataset, write_dataset
+from raw_store import RawStore
+
+
+def load_input(path, limit=None):
+    """Đọc dữ liệu đầu vào: một file .csv/.parquet đã xử lý, hoặc thư mục raw (đọc qua RawStore)"""
+    if os.path.isdir(path):
+        rows = []
+        for article in RawStore(path).iter_articles():
+            rows.append(article)
+            if limit and len(rows) >= limit:
+                break
+        return pd.DataFrame(rows)
+    df = read_dataset(path)
+    return df.head(limit) if limit else df
+
+
+def timed(fn, repeat):
+    """Thời gian chạy nhanh nhất trong `repeat` lần (giây) và kết quả của lần cuối"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="So sánh kích thước và tốc độ đọc/ghi dữ liệu đã xử lý giữa CSV và Parquet")
+    parser.add_argument('input', help="File dữ liệu (.csv/.parquet) hoặc thư mục raw, ví dụ data/raw")
+    parser.add_argument('--columns', default='url,summary',
+                        help="Các cột đọc riêng để đo việc chỉ đọc một phần cột, cách nhau bởi dấu phẩy")
+    parser.add_argument('--limit', type=int, default=None, help="Số dòng tối đa lấy từ đầu vào")
+    parser.add_argument('--repeat', type=int, default=3, help="Số lần đo mỗi phép, lấy lần nhanh nhất")
+    args = parser.parse_args()
+
+    if pq is None:
+        print("Chưa cài đặt pyarrow, không đo được Parquet")
+        return
+
+    df = load_input(args.input, args.limit)
+    columns = [c for c in args.columns.split(',') if c in df.columns]
+    print(f"{len(df)} dòng, {len(df.columns)} cột; đọc riêng các cột: {', '.join(columns) or '(không có)'}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for suffix in (CSV_SUFFIX, PARQUET_SUFFIX):
+            path = os.path.join(tmp, 'dataset' + suffix)
+            write_time, _ = timed(lambda: write_dataset(df, path), args.repeat)
+            read_time, loaded = timed(lambda: read_dataset(path), args.repeat)
+            if len(loaded) != len(df):
+                print(f"Cảnh báo: {suffix} đọc lại được {len(loaded)}/{len(df)} dòng")
+            column_time = timed(lambda: read_dataset(path, columns=columns), args.repeat)[0] if columns else None
+            results[suffix] = (os.path.getsize(path), write_time, read_time, column_time)
+
+    csv_size, _, csv_read, csv_columns = results[CSV_SUFFIX]
+    for suffix, (size, write_time, read_time, column_time) in results.items():
+        line = (f"{suffix:9s} {size / (1024 * 1024):8.1f} MB (x{size / csv_size:4.2f})  ghi {write_time:6.2f} giây  "
+                f"đọc {read_time:6.2f} giây (x{csv_read / read_time:5.1f})")
+        if column_time is not None:
+            line += f"  đọc {len(columns)} cột {column_time:6.2f} giây (x{csv_columns / column_time:5.1f})"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
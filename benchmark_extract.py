@@ -0,0 +1,117 @@
+import argparse
+import glob
+import json
+import logging
+import os
+import time
+from urllib.parse import urlparse
+
+import html_extract
+from new_vneconomy import extract_vneconomy_article
+from news_scraper import extract_vietnamnet_article
+from news_vtv import extract_vtv_article
+
+EXTRACTORS = {
+    'vtv': extract_vtv_article,
+    'vneconomy': extract_vneconomy_article,
+    'vietnamnet': extract_vietnamnet_article,
+}
+
+
+def source_from_url(url):
+    host = urlparse(url).netloc
+    for source in EXTRACTORS:
+        if host.endswith(f"{source}.vn"):
+            return source
+    return None
+
+
+def load_fixtures(fixtures_dir):
+    """Đọc các trang mẫu dạng <fixtures_dir>/<nguồn>/*.htm(l), trả về danh sách (nguồn, url, html)"""
+    pages = []
+    for source in EXTRACTORS:
+        for path in sorted(glob.glob(os.path.join(fixtures_dir, source, '*.htm*'))):
+            with open(path, 'r', encoding='utf-8') as f:
+                pages.append((source, path, f.read()))
+    return pages
+
+
+def load_http_cache(cache_dir, limit=None):
+    """Đọc các trang bài viết đã lưu trong cache HTTP của scraper, nhận nguồn theo tên miền trong metadata"""
+    pages = []
+    for meta_path in sorted(glob.glob(os.path.join(cache_dir, '*', '*.json'))):
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(meta_path[:-len('.json')] + '.body', 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            continue
+        source = source_from_url(meta.get('url', ''))
+        if source is None or not meta['url'].endswith(('.htm', '.html')):
+            continue
+        pages.append((source, meta['url'], body.decode('utf-8', errors='replace')))
+        if limit and len(pages) >= limit:
+            break
+    return pages
+
+
+def run_backend(backend, pages, repeat):
+    """Chạy trích xuất trên toàn bộ trang `repeat` lần, trả về (số trang/giây, kết quả của lượt đầu)"""
+    html_extract.set_backend(backend)
+    results = []
+    start = time.perf_counter()
+    for round_index in range(repeat):
+        for source, url, html in pages:
+            try:
+                article = EXTRACTORS[source](html, url, 'benchmark')
+            except Exception:
+                article = None
+            if round_index == 0:
+                results.append(article)
+    elapsed = time.perf_counter() - start
+    return len(pages) * repeat / elapsed, results
+
+
+def same_article(a, b):
+    if a is None or b is None:
+        return a is b
+    ignore = {'scraped_at'}
+    return {k: v for k, v in a.items() if k not in ignore} == {k: v for k, v in b.items() if k not in ignore}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="So sánh tốc độ trích xuất bài viết giữa các backend phân tích HTML")
+    parser.add_argument('--fixtures', help="Thư mục trang mẫu, mỗi nguồn một thư mục con (vtv/, vneconomy/, vietnamnet/)")
+    parser.add_argument('--cache-dir', default='http_cache', help="Thư mục cache HTTP khi không dùng --fixtures")
+    parser.add_argument('--limit', type=int, default=None, help="Số trang tối đa đọc từ cache")
+    parser.add_argument('--repeat', type=int, default=3, help="Số lượt chạy trên mỗi trang")
+    args = parser.parse_args()
+
+    pages = load_fixtures(args.fixtures) if args.fixtures else load_http_cache(args.cache_dir, args.limit)
+    if not pages:
+        print("Không tìm thấy trang HTML nào để đo")
+        return
+
+    backends = [b for b in html_extract.BACKENDS if b == 'html.parser' or html_extract.HAS_LXML]
+    by_source = {}
+    for page in pages:
+        by_source.setdefault(page[0], []).append(page)
+    print(f"{len(pages)} trang ({', '.join(f'{s}: {len(p)}' for s, p in by_source.items())}), {args.repeat} lượt")
+
+    # Cảnh báo của hàm trích xuất (trang thiếu tiêu đề, nội dung ngắn...) không liên quan tới phép đo
+    logging.disable(logging.WARNING)
+    for group, group_pages in [('tất cả', pages)] + list(by_source.items()):
+        measured = {backend: run_backend(backend, group_pages, args.repeat) for backend in backends}
+        baseline_speed, baseline_results = measured['html.parser']
+        print(f"\n[{group}]")
+        for backend, (speed, results) in measured.items():
+            extracted = sum(1 for r in results if r)
+            identical = sum(1 for a, b in zip(results, baseline_results) if same_article(a, b))
+            print(f"{backend:12s} {speed:9.1f} trang/giây  x{speed / baseline_speed:5.2f}  "
+                  f"trích xuất được {extracted}/{len(group_pages)}, giống html.parser {identical}/{len(group_pages)}")
+    logging.disable(logging.NOTSET)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.wait import WebDriverWait
+
+# Các liên kết bài viết trong timeline, cùng điều kiện với XPath //div[@class='list_news timeline']//a[@href]
+TIMELINE_LINKS_CSS = "div[class='list_news timeline'] a[href]"
+COUNT_TIMELINE_LINKS_JS = f'return document.querySelectorAll("{TIMELINE_LINKS_CSS}").length;'
+LOAD_MORE_XPATH = "//a[contains(text(),'Xem thêm')]"
+
+
+class BrowserPool:
+    """
+    Nhóm các Chrome headless sống lâu, dùng chung giữa các chuyên mục.
+    Driver chỉ được khởi tạo khi cần (tối đa `size`) và được giữ lại cho tới khi gọi close().
+    """
+
+    def __init__(self, size=3, load_timeout=30, step_timeout=10):
+        self.size = size
+        self.load_timeout = load_timeout
+        # Thời gian tối đa chờ timeline nạp thêm bài sau mỗi lần cuộn / bấm "Xem thêm"
+        self.step_timeout = step_timeout
+        self._idle = queue.Queue()
+        self._created = 0
+        self._all = []
+        self._lock = threading.Lock()
+
+    def _new_driver(self):
+        options = Options()
+        options.add_argument("--headless")
+        options.add_argument("--disable-gpu")
+        options.add_argument("--window-size=1920,1080")
+        # Không chờ tải hết ảnh/quảng cáo, chỉ cần DOM sẵn sàng
+        options.page_load_strategy = 'eager'
+        driver = webdriver.Chrome(options=options)
+        driver.set_page_load_timeout(self.load_timeout)
+        return driver
+
+    @contextmanager
+    def driver(self):
+        """Mượn một driver từ pool, tạo mới nếu pool chưa đủ `size` driver"""
+        driver = None
+        with self._lock:
+            if self._idle.empty() and self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                driver = self._new_driver()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+            with self._lock:
+                self._all.append(driver)
+        else:
+            driver = self._idle.get()
+
+        broken = False
+        try:
+            yield driver
+        except WebDriverException:
+            broken = True
+            raise
+        finally:
+            if broken:
+                # Driver hỏng (crash, mất kết nối) thì bỏ đi, lần sau sẽ tạo driver mới
+                self._discard(driver)
+            else:
+                self._idle.put(driver)
+
+    def _discard(self, driver):
+        with self._lock:
+            self._created -= 1
+            if driver in self._all:
+                self._all.remove(driver)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def expand_timeline(self, url, max_steps=10, should_stop=None):
+        """
+        Mở trang chuyên mục, cuộn / bấm "Xem thêm" để nạp thêm bài, trả về liên kết .htm theo thứ tự hiển thị.
+        Mỗi bước chờ đến khi số liên kết trong timeline tăng lên thay vì ngủ cố định; hết step_timeout thì dừng.
+        Args:
+            url (str): Trang chuyên mục.
+            max_steps (int): Số lần nạp thêm tối đa.
+            should_stop (callable): Nhận danh sách liên kết vừa nạp, trả về True để ngừng nạp thêm.
+        """
+        with self.driver() as driver:
+            driver.get(url)
+            try:
+                WebDriverWait(driver, self.load_timeout).until(
+                    lambda d: d.execute_script(COUNT_TIMELINE_LINKS_JS) > 0
+                )
+            except TimeoutException:
+                logging.warning(f"Timeline không xuất hiện trong {self.load_timeout}s: {url}")
+                return []
+
+            seen_links = set()
+            for _ in range(max_steps):
+                if should_stop is not None:
+                    loaded = [href for href in self._timeline_links(driver) if href not in seen_links]
+                    seen_links.update(loaded)
+                    if should_stop(loaded):
+                        break
+
+                count = driver.execute_script(COUNT_TIMELINE_LINKS_JS)
+                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+                # Bấm "Xem thêm" nếu có, không chờ khi nút không tồn tại
+                for load_more in driver.find_elements(By.XPATH, LOAD_MORE_XPATH):
+                    if load_more.is_displayed():
+                        driver.execute_script("arguments[0].click();", load_more)
+                        break
+                try:
+                    WebDriverWait(driver, self.step_timeout).until(
+                        lambda d: d.execute_script(COUNT_TIMELINE_LINKS_JS) > count
+                    )
+                except TimeoutException:
+                    break  # Timeline không nạp thêm bài nào nữa
+
+            return self._timeline_links(driver)
+
+    @staticmethod
+    def _timeline_links(driver):
+        """Các liên kết bài viết .htm đang có trong timeline, theo thứ tự hiển thị"""
+        hrefs = driver.execute_script(
+            f'return Array.from(document.querySelectorAll("{TIMELINE_LINKS_CSS}"), a => a.href);'
+        )
+        return list(dict.fromkeys(href for href in hrefs if href.endswith('.htm')))
+
+    def close(self):
+        """Đóng toàn bộ driver của pool"""
+        with self._lock:
+            drivers, self._all = self._all, []
+            self._created = 0
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception as e:
+                logging.warning(f"Lỗi khi đóng trình duyệt: {str(e)}")
+        self._idle = queue.Queue()
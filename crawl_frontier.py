@@ -0,0 +1,222 @@
+import hashlib
+import sqlite3
+import threading
+import time
+
+PENDING = 0
+DONE = 1
+FAILED = 2
+# Chuyên mục trả ra cho url chưa biết chuyên mục (ví dụ url lấy từ sitemap mà đường dẫn không chứa chuyên mục)
+UNKNOWN_CATEGORY = "khac"
+
+
+def url_hash(url):
+    """Băm url thành số nguyên 64 bit có dấu (vừa kiểu INTEGER của SQLite)"""
+    digest = hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+class CrawlFrontier:
+    """
+    Hàng đợi các url cần thu thập kèm tập url đã thấy, lưu bền vững trong SQLite.
+    Tập băm url được nạp lên bộ nhớ khi khởi tạo nên việc kiểm tra trùng là O(1), kể cả giữa các lần chạy.
+    """
+
+    def __init__(self, db_path, commit_every=500):
+        self.db_path = db_path
+        self.commit_every = commit_every
+        self._lock = threading.Lock()
+        self._uncommitted = 0
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS urls (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url_hash INTEGER NOT NULL UNIQUE,
+                url TEXT NOT NULL,
+                source TEXT NOT NULL,
+                category TEXT,
+                status INTEGER NOT NULL DEFAULT 0,
+                added_at REAL NOT NULL
+            )
+        """)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(urls)")}
+        if 'lastmod' not in columns:
+            # Ngày cập nhật lấy từ sitemap/RSS, file frontier cũ chưa có cột này
+            self.conn.execute("ALTER TABLE urls ADD COLUMN lastmod TEXT")
+        if 'lease_owner' not in columns:
+            # Hợp đồng thuê (lease) của worker đang xử lý url, dùng cho chế độ nhiều worker
+            self.conn.execute("ALTER TABLE urls ADD COLUMN lease_owner TEXT")
+            self.conn.execute("ALTER TABLE urls ADD COLUMN lease_expires REAL")
+            self.conn.execute("ALTER TABLE urls ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_urls_status ON urls (source, status)")
+        self.conn.commit()
+        self._seen = {row[0] for row in self.conn.execute("SELECT url_hash FROM urls")}
+        self._uncategorized = {row[0] for row in self.conn.execute("SELECT url_hash FROM urls WHERE category IS NULL")}
+
+    def __len__(self):
+        return len(self._seen)
+
+    def __contains__(self, url):
+        return url_hash(url) in self._seen
+
+    def is_new(self, url):
+        """
+        True nếu add(url) kèm chuyên mục sẽ được tính là url mới: url chưa từng thấy, hoặc đã thấy (từ sitemap)
+        nhưng chưa có chuyên mục. Dùng để quyết định dừng phân trang mà không thêm url vào frontier.
+        """
+        h = url_hash(url)
+        with self._lock:
+            return h not in self._seen or h in self._uncategorized
+
+    def add(self, url, source, category, lastmod=None):
+        """
+        Thêm url vào hàng đợi, trả về False nếu url đã từng được thấy.
+        category=None nghĩa là chưa biết chuyên mục; url đó được gán chuyên mục ở lần add sau có chuyên mục
+        (ví dụ khi trang danh sách của chuyên mục tìm thấy nó), và lần add đó được tính như một url mới.
+        """
+        with self._lock:
+            added = self._add_locked(url_hash(url), url, source, category, lastmod)
+            if added:
+                self._maybe_commit()
+        return added
+
+    def add_many(self, entries):
+        """
+        Thêm nhiều url (url, source, category, lastmod) trong một giao dịch rồi commit ngay, để khoá ghi của
+        file frontier dùng chung không bị giữ trong lúc bên gọi còn đang tải dữ liệu. Trả về số url mới.
+        """
+        added = 0
+        with self._lock:
+            for url, source, category, lastmod in entries:
+                added += self._add_locked(url_hash(url), url, source, category, lastmod)
+            if added:
+                self.conn.commit()
+                self._uncommitted = 0
+        return added
+
+    def _add_locked(self, h, url, source, category, lastmod):
+        if h in self._seen:
+            if category is None or h not in self._uncategorized:
+                return False
+            self._uncategorized.discard(h)
+            self.conn.execute("UPDATE urls SET category = ? WHERE url_hash = ? AND category IS NULL", (category, h))
+            return True
+        self._seen.add(h)
+        if category is None:
+            self._uncategorized.add(h)
+        self.conn.execute(
+            "INSERT OR IGNORE INTO urls (url_hash, url, source, category, status, added_at, lastmod) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (h, url, source, category, PENDING, time.time(), lastmod)
+        )
+        return True
+
+    def pending(self, source=None, since=None):
+        """
+        Danh sách các url chưa thu thập, theo thứ tự được thêm vào; since (YYYY-MM-DD) bỏ các url có lastmod cũ hơn.
+        Các url đang được worker khác thuê (lease còn hạn) không được trả về.
+        """
+        query = ("SELECT url, source, COALESCE(category, ?) FROM urls WHERE status = ? "
+                 "AND (lease_expires IS NULL OR lease_expires < ?)")
+        params = [UNKNOWN_CATEGORY, PENDING, time.time()]
+        if source:
+            query += " AND source = ?"
+            params.append(source)
+        if since:
+            query += " AND (lastmod IS NULL OR substr(lastmod, 1, 10) >= ?)"
+            params.append(since)
+        with self._lock:
+            self.conn.commit()
+            rows = self.conn.execute(query + " ORDER BY id", params).fetchall()
+        return [{'url': url, 'source': src, 'category': category} for url, src, category in rows]
+
+    def claim(self, worker_id, limit=20, lease_seconds=300, source=None):
+        """
+        Thuê tối đa `limit` url đang chờ cho worker trong `lease_seconds` giây, trả về danh sách dict như pending().
+        Việc chọn và ghi lease nằm trong một transaction IMMEDIATE nên hai worker (kể cả ở hai tiến trình khác nhau)
+        không bao giờ nhận cùng một url. Worker chết giữa chừng thì lease hết hạn và url được thuê lại.
+        """
+        now = time.time()
+        query = ("SELECT id, url, source, COALESCE(category, ?) FROM urls WHERE status = ? "
+                 "AND (lease_expires IS NULL OR lease_expires < ?)")
+        params = [UNKNOWN_CATEGORY, PENDING, now]
+        if source:
+            query += " AND source = ?"
+            params.append(source)
+        with self._lock:
+            self.conn.commit()
+            self._uncommitted = 0
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.conn.execute(query + " ORDER BY id LIMIT ?", params + [limit]).fetchall()
+                self.conn.executemany(
+                    "UPDATE urls SET lease_owner = ?, lease_expires = ? WHERE id = ?",
+                    [(worker_id, now + lease_seconds, row[0]) for row in rows]
+                )
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+        return [{'url': url, 'source': src, 'category': category} for _, url, src, category in rows]
+
+    def release(self, url, max_attempts=3, count_attempt=True):
+        """
+        Trả url chưa thu thập được về hàng đợi để worker khác thử lại;
+        sau `max_attempts` lần thất bại thì đánh dấu FAILED.
+        count_attempt=False khi worker bị dừng giữa lô: url chưa chắc đã được thử nên không tính là một lần thất bại.
+        """
+        step = 1 if count_attempt else 0
+        with self._lock:
+            self.conn.execute(
+                "UPDATE urls SET attempts = attempts + ?, lease_owner = NULL, lease_expires = NULL, "
+                "status = CASE WHEN attempts + ? >= ? THEN ? ELSE status END WHERE url_hash = ?",
+                (step, step, max_attempts, FAILED, url_hash(url))
+            )
+            self.conn.commit()
+            self._uncommitted = 0
+
+    def mark_done(self, url):
+        self._set_status(url, DONE)
+
+    def mark_failed(self, url):
+        self._set_status(url, FAILED)
+
+    def _set_status(self, url, status):
+        # Commit ngay: nếu bị dừng giữa chừng, bài đã lưu sẽ không bị thu thập (và lưu) lại lần nữa
+        with self._lock:
+            self.conn.execute(
+                "UPDATE urls SET status = ?, lease_owner = NULL, lease_expires = NULL WHERE url_hash = ?",
+                (status, url_hash(url))
+            )
+            self.conn.commit()
+            self._uncommitted = 0
+
+    def count(self, source=None, status=None):
+        """Đếm số url theo nguồn và/hoặc trạng thái"""
+        query = "SELECT COUNT(*) FROM urls WHERE 1 = 1"
+        params = []
+        if source:
+            query += " AND source = ?"
+            params.append(source)
+        if status is not None:
+            query += " AND status = ?"
+            params.append(status)
+        with self._lock:
+            return self.conn.execute(query, params).fetchone()[0]
+
+    def _maybe_commit(self):
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self.conn.commit()
+            self._uncommitted = 0
+
+    def commit(self):
+        with self._lock:
+            self.conn.commit()
+            self._uncommitted = 0
+
+    def close(self):
+        self.commit()
+        self.conn.close()
@@ -0,0 +1,140 @@
+import logging
+import sqlite3
+import threading
+import time
+
+
+def reached_known_articles(page_links, new_links, watermark=None):
+    """
+    Chế độ tăng dần: trang danh sách không còn bài mới nào, hoặc đã chạm tới bài mốc của lần chạy trước,
+    nên các trang sau (cũ hơn) không cần tải nữa.
+    """
+    if not page_links:
+        return False
+    if new_links == 0:
+        return True
+    return watermark is not None and watermark['newest_url'] in page_links
+
+
+class CrawlJournal:
+    """
+    Nhật ký thu thập: ghi lại từng trang danh sách (nguồn, chuyên mục, trang) đã xử lý xong.
+    Dùng chung file SQLite với CrawlFrontier, nơi lưu trạng thái hoàn thành của từng bài viết,
+    nên khi chạy lại sau sự cố có thể tiếp tục đúng chỗ đã dừng.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS listing_pages (
+                source TEXT NOT NULL,
+                category TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                links INTEGER NOT NULL,
+                finished_at REAL NOT NULL,
+                PRIMARY KEY (source, category, page)
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS runs (
+                source TEXT PRIMARY KEY,
+                started_at REAL NOT NULL,
+                finished_at REAL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS watermarks (
+                source TEXT NOT NULL,
+                category TEXT NOT NULL,
+                newest_url TEXT NOT NULL,
+                pub_date TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (source, category)
+            )
+        """)
+        self.conn.commit()
+
+    def start_run(self, source, resume=True):
+        """
+        Bắt đầu một lần thu thập cho nguồn, trả về True nếu đang tiếp tục một lần chạy dở.
+        Lần chạy trước đã kết thúc (hoặc resume=False) thì tiến độ trang danh sách được xoá để thu thập lại từ đầu.
+        """
+        with self._lock:
+            row = self.conn.execute("SELECT finished_at FROM runs WHERE source = ?", (source,)).fetchone()
+            resumed = resume and row is not None and row[0] is None
+            if resumed:
+                done = self.conn.execute(
+                    "SELECT COUNT(*) FROM listing_pages WHERE source = ?", (source,)
+                ).fetchone()[0]
+                logging.info(f"Tiếp tục lần thu thập dở của {source}: đã xong {done} trang danh sách")
+            else:
+                self.conn.execute("DELETE FROM listing_pages WHERE source = ?", (source,))
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO runs (source, started_at, finished_at) VALUES (?, ?, NULL)",
+                    (source, time.time())
+                )
+            self.conn.commit()
+        return resumed
+
+    def finish_run(self, source):
+        """Đánh dấu lần thu thập đã hoàn tất, lần chạy sau sẽ bắt đầu lại từ trang đầu"""
+        with self._lock:
+            self.conn.execute("UPDATE runs SET finished_at = ? WHERE source = ?", (time.time(), source))
+            self.conn.commit()
+
+    def is_page_done(self, source, category, page):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM listing_pages WHERE source = ? AND category = ? AND page = ?",
+                (source, category, page)
+            ).fetchone()
+        return row is not None
+
+    def mark_page_done(self, source, category, page, links):
+        """Ghi nhận trang danh sách đã xử lý xong, commit ngay để không mất khi bị dừng đột ngột"""
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO listing_pages (source, category, page, links, finished_at) VALUES (?, ?, ?, ?, ?)",
+                (source, category, page, links, time.time())
+            )
+            self.conn.commit()
+
+    def get_watermark(self, source, category):
+        """Bài mới nhất đã biết của chuyên mục: dict có 'newest_url' và 'pub_date', hoặc None"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT newest_url, pub_date FROM watermarks WHERE source = ? AND category = ?",
+                (source, category)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'newest_url': row[0], 'pub_date': row[1]}
+
+    def update_watermark(self, source, category, newest_url):
+        """Ghi nhận bài đứng đầu trang danh sách mới nhất của chuyên mục"""
+        with self._lock:
+            self.conn.execute(
+                """INSERT INTO watermarks (source, category, newest_url, pub_date, updated_at) VALUES (?, ?, ?, NULL, ?)
+                   ON CONFLICT (source, category) DO UPDATE SET
+                       pub_date = CASE WHEN newest_url = excluded.newest_url THEN pub_date END,
+                       newest_url = excluded.newest_url,
+                       updated_at = excluded.updated_at""",
+                (source, category, newest_url, time.time())
+            )
+            self.conn.commit()
+
+    def set_watermark_date(self, source, category, url, pub_date):
+        """Lưu ngày đăng khi bài viết đang là mốc của chuyên mục được thu thập xong"""
+        with self._lock:
+            self.conn.execute(
+                "UPDATE watermarks SET pub_date = ? WHERE source = ? AND category = ? AND newest_url = ?",
+                (pub_date, source, category, url)
+            )
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
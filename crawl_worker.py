@@ -0,0 +1,147 @@
+import argparse
+import logging
+import os
+import signal
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from async_fetcher import AsyncFetcher
+from retry_policy import PERMANENT
+from sources import SOURCES
+
+
+class CrawlWorker:
+    """
+    Worker lấy url bài viết từ frontier SQLite dùng chung theo từng lô có lease, tải và trích xuất bằng hàm extract
+    của nguồn, rồi báo kết quả về frontier: bài lưu được đánh dấu DONE, bài lỗi được trả lại hàng đợi để thử lại.
+    Chạy nhiều worker để tăng tốc độ mà không tải trùng: nhiều tiến trình trên một máy, hoặc nhiều máy khi output_dir
+    nằm trên ổ dùng chung có hỗ trợ khoá file (SQLite cần khoá file để lease hoạt động đúng).
+    """
+
+    def __init__(self, source, worker_id=None, batch_size=20, lease_seconds=300, max_attempts=3):
+        self.source = source
+        self.scraper = source.scraper
+        self.frontier = source.scraper.frontier
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.batch_size = batch_size
+        # Lease phải đủ dài để tải xong một lô, nếu không url sẽ bị worker khác thuê lại
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    def run(self, poll_interval=0, max_idle=600):
+        """
+        Xử lý các lô cho tới khi hàng đợi trống, trả về số bài viết đã lưu.
+        poll_interval > 0 thì chờ rồi hỏi lại thay vì dừng, dùng khi một tiến trình khác vẫn đang tìm liên kết;
+        worker dừng khi hàng đợi trống liên tục quá max_idle giây. max_idle=None để chạy như dịch vụ cho tới khi
+        bị dừng (Ctrl+C hoặc SIGTERM): khi đó bài đang chờ được ghi nốt và các url chưa xong được trả lại hàng đợi.
+        """
+        fetcher = AsyncFetcher(self.scraper.session, self.scraper.headers, max_per_host=self.scraper.max_per_host,
+                               rate_limiter=self.scraper.rate_limiter, parse_workers=self.scraper.parse_workers,
+                               archive=self.scraper.html_archive, retry_policy=self.scraper.retry_policy,
+                               circuit_breaker=self.scraper.circuit_breaker,
+                               hedge_requests=self.scraper.hedge_requests)
+        # Một pool trích xuất cho cả vòng đời worker: tạo pool cho từng lô 20 url thì phần lớn thời gian
+        # là khởi động tiến trình và import module
+        executor = ProcessPoolExecutor(max_workers=fetcher.parse_workers) if fetcher.parse_workers > 0 else None
+        try:
+            return self._run_batches(fetcher, executor, poll_interval, max_idle)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    def _run_batches(self, fetcher, executor, poll_interval, max_idle):
+        stored = 0
+        idle_since = None
+        try:
+            while True:
+                batch = self.frontier.claim(self.worker_id, limit=self.batch_size, lease_seconds=self.lease_seconds,
+                                            source=self.source.name)
+                if not batch:
+                    if poll_interval > 0:
+                        if idle_since is None:
+                            idle_since = time.monotonic()
+                        if max_idle is None or time.monotonic() - idle_since < max_idle:
+                            time.sleep(poll_interval)
+                            continue
+                        logging.info(f"Worker {self.worker_id}: hàng đợi trống quá {max_idle} giây, dừng")
+                    break
+                idle_since = None
+                stored += self._run_batch(fetcher, executor, batch, stored)
+        except KeyboardInterrupt:
+            logging.info(f"Worker {self.worker_id}: dừng theo yêu cầu, đã lưu {stored} bài viết")
+            return stored
+        logging.info(f"Worker {self.worker_id}: hàng đợi {self.source.name} đã trống, đã lưu {stored} bài viết")
+        return stored
+
+    def _run_batch(self, fetcher, executor, batch, stored):
+        """Tải một lô đã thuê, trả về số bài viết đã lưu"""
+        done = set()
+        failed = set()
+
+        def on_article(article_data):
+            self.scraper._store_article(article_data)
+            done.add(article_data['url'])
+
+        def on_failure(article_info, outcome):
+            # Lỗi vĩnh viễn (404...) không trả lại hàng đợi, các worker khác không phải thử lại
+            if outcome == PERMANENT:
+                self.frontier.mark_failed(article_info['url'])
+                failed.add(article_info['url'])
+
+        interrupted = True
+        try:
+            count = fetcher.fetch_all(batch, self.source.extract, on_article,
+                                      desc=f"Worker {self.worker_id} - {self.source.name}", on_failure=on_failure,
+                                      executor=executor)
+            interrupted = False
+        finally:
+            # Ghi nốt nhóm bài viết đang chờ trước khi trả lại các url chưa xong cho hàng đợi, kể cả khi bị dừng
+            # giữa lô, để worker khác không phải chờ hết lease
+            self.scraper._flush_raw_store()
+            for link in batch:
+                if link['url'] not in done and link['url'] not in failed:
+                    self.frontier.release(link['url'], max_attempts=self.max_attempts, count_attempt=not interrupted)
+        logging.info(f"Worker {self.worker_id}: lô {len(batch)} url, lưu {len(done)} bài, "
+                     f"{len(failed)} url hỏng, tổng {stored + count} bài")
+        return count
+
+
+def _stop_on_sigterm(signum, frame):
+    # SIGTERM (systemd, docker stop...) được xử lý như Ctrl+C để worker trả lô đang thuê trước khi thoát
+    raise KeyboardInterrupt
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Worker thu thập bài viết từ hàng đợi frontier dùng chung")
+    parser.add_argument('source', choices=list(SOURCES))
+    parser.add_argument('--output-dir', default=None, help="Thư mục dữ liệu của nguồn (chứa frontier.sqlite3)")
+    parser.add_argument('--worker-id', default=None)
+    parser.add_argument('--batch-size', type=int, default=20)
+    parser.add_argument('--lease', type=int, default=300, help="Thời hạn lease của một lô (giây)")
+    parser.add_argument('--max-attempts', type=int, default=3)
+    parser.add_argument('--collect', action='store_true',
+                        help="Tìm liên kết (trang danh sách) trước khi tải; chỉ cần một worker làm việc này")
+    parser.add_argument('--pages', type=int, default=50, help="Số trang danh sách mỗi chuyên mục khi dùng --collect")
+    parser.add_argument('--incremental', action='store_true')
+    parser.add_argument('--poll', type=float, default=0, help="Chờ (giây) rồi hỏi lại khi hàng đợi trống")
+    parser.add_argument('--max-idle', type=float, default=600,
+                        help="Dừng khi hàng đợi trống liên tục quá số giây này (dùng với --poll); 0 để chạy mãi")
+    parser.add_argument('--parse-workers', type=int, default=1, help="Số tiến trình phân tích HTML của worker")
+    parser.add_argument('--hedge', action='store_true', help="Gửi bản sao cho request chậm hơn p95 của host")
+    parser.add_argument('--http2', action='store_true', help="Dùng HTTP/2 (cần cài đặt httpx[http2])")
+    args = parser.parse_args()
+
+    source_kwargs = {'parse_workers': args.parse_workers, 'hedge_requests': args.hedge,
+                     'http2': args.http2}
+    if args.output_dir:
+        source_kwargs['output_dir'] = args.output_dir
+    signal.signal(signal.SIGTERM, _stop_on_sigterm)
+    source = SOURCES[args.source](**source_kwargs)
+    try:
+        if args.collect:
+            source.collect_links(args.pages, incremental=args.incremental)
+        CrawlWorker(source, worker_id=args.worker_id, batch_size=args.batch_size, lease_seconds=args.lease,
+                    max_attempts=args.max_attempts).run(poll_interval=args.poll, max_idle=args.max_idle or None)
+    finally:
+        source.commit()
@@ -0,0 +1,158 @@
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+PARQUET_SUFFIX = '.parquet'
+CSV_SUFFIX = '.csv'
+# Số dòng mỗi row group: đủ nhỏ để đọc từng phần, đủ lớn để nén tốt các cột văn bản dài
+ROW_GROUP_SIZE = 1000
+COMPRESSION = 'zstd'
+
+
+def dataset_path(directory, name):
+    """
+    Đường dẫn file của bộ dữ liệu `name` trong thư mục `directory`: Parquet nén zstd nếu đã cài pyarrow,
+    không thì CSV như trước.
+    """
+    return os.path.join(directory, name + (PARQUET_SUFFIX if pq is not None else CSV_SUFFIX))
+
+
+def find_dataset(directory, name):
+    """Tìm file đã ghi của bộ dữ liệu `name`, ưu tiên Parquet rồi tới CSV. Trả về None nếu không có"""
+    for suffix in (PARQUET_SUFFIX, CSV_SUFFIX):
+        path = os.path.join(directory, name + suffix)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def read_dataset(path, columns=None):
+    """
+    Đọc một bộ dữ liệu thành DataFrame. `columns` giới hạn các cột cần đọc: với Parquet các cột khác
+    không được đọc từ đĩa hay giải nén, với CSV thì vẫn phải phân tích cả file.
+    """
+    if path.endswith(PARQUET_SUFFIX):
+        if pq is None:
+            raise RuntimeError("Cần cài đặt pyarrow để đọc file Parquet")
+        return pq.read_table(path, columns=columns).to_pandas()
+    return pd.read_csv(path, usecols=columns, encoding='utf-8')
+
+
+def write_dataset(df, path, row_group_size=ROW_GROUP_SIZE):
+    """Ghi DataFrame ra Parquet (chia row group, nén zstd) hoặc CSV tuỳ theo phần mở rộng của path"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    if path.endswith(PARQUET_SUFFIX):
+        if pq is None:
+            raise RuntimeError("Cần cài đặt pyarrow để ghi file Parquet")
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        pq.write_table(table, path, row_group_size=row_group_size, compression=COMPRESSION)
+    else:
+        df.to_csv(path, index=False, encoding='utf-8')
+
+
+def iter_dataset(path, batch_size=ROW_GROUP_SIZE):
+    """
+    Duyệt từng dòng (dict) của một bộ dữ liệu, đọc theo lô `batch_size` dòng: Parquet theo row group,
+    CSV theo từng đoạn, nên bộ nhớ không phụ thuộc kích thước file.
+    """
+    if path.endswith(PARQUET_SUFFIX):
+        if pq is None:
+            raise RuntimeError("Cần cài đặt pyarrow để đọc file Parquet")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            yield from batch.to_pylist()
+    else:
+        try:
+            chunks = pd.read_csv(path, chunksize=batch_size, encoding='utf-8', keep_default_na=False)
+        except pd.errors.EmptyDataError:
+            return
+        for chunk in chunks:
+            yield from chunk.to_dict('records')
+
+
+def _string_nulls(schema):
+    # Cột toàn None trong lô đầu được suy ra kiểu null, các lô sau có giá trị chuỗi sẽ không khớp
+    return pa.schema([field.with_type(pa.string()) if pa.types.is_null(field.type) else field for field in schema])
+
+
+class BatchWriter:
+    """
+    Ghi các bài viết đã xử lý theo từng lô `batch_size` dòng, thay vì gom toàn bộ vào một DataFrame:
+    bộ nhớ dùng cho bước ghi không phụ thuộc vào số bài viết.
+    File .parquet: mỗi lô là một row group. File .csv: mỗi lô được ghi nối vào cuối file.
+    """
+
+    def __init__(self, path, batch_size=ROW_GROUP_SIZE):
+        if path.endswith(PARQUET_SUFFIX) and pq is None:
+            raise RuntimeError("Cần cài đặt pyarrow để ghi file Parquet")
+        self.path = path
+        self.batch_size = batch_size
+        self.count = 0
+        self._batch = []
+        self._started = False
+        self._parquet_writer = None
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def write(self, row):
+        self._batch.append(row)
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if not self._batch and self._started:
+            return
+        if self.path.endswith(PARQUET_SUFFIX):
+            self._flush_parquet()
+        else:
+            pd.DataFrame(self._batch).to_csv(self.path, mode='a' if self._started else 'w',
+                                             header=not self._started, index=False, encoding='utf-8')
+        self.count += len(self._batch)
+        self._started = True
+        self._batch = []
+
+    def _flush_parquet(self):
+        if self._parquet_writer is None:
+            if not self._batch:
+                # Không có dòng nào: vẫn ghi file rỗng để bước sau không đọc nhầm file cũ
+                pq.write_table(pa.table({}), self.path)
+                return
+            table = pa.Table.from_pylist(self._batch)
+            table = table.cast(_string_nulls(table.schema))
+            self._parquet_writer = pq.ParquetWriter(self.path, table.schema, compression=COMPRESSION)
+        else:
+            table = pa.Table.from_pylist(self._batch, schema=self._parquet_writer.schema)
+        self._parquet_writer.write_table(table, row_group_size=self.batch_size)
+
+    def close(self):
+        """Ghi nốt lô cuối, trả về tổng số dòng đã ghi"""
+        self._flush()
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+        return self.count
+
+    def abort(self):
+        """Bỏ file đang ghi dở: không ghi lô còn lại, đóng và xoá file để không ai đọc phải file thiếu dòng"""
+        self._batch = []
+        # File chỉ bị mở ghi (và ghi đè) từ lần ghi lô đầu tiên; trước đó file cũ cùng tên không bị động tới
+        written = self._started or self._parquet_writer is not None
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+        if written and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
@@ -0,0 +1,53 @@
+import json
+import logging
+import os
+
+from html_extract import SelectorChain
+
+# File cấu hình selector của từng nguồn, có thể thay bằng biến môi trường EXTRACTION_PROFILES
+PROFILES_PATH = os.environ.get(
+    'EXTRACTION_PROFILES',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'extraction_profiles.json')
+)
+
+
+def load_profiles(path=PROFILES_PATH):
+    """
+    Đọc cấu hình và biên dịch toàn bộ selector một lần.
+    Cấu hình có dạng {nguồn: {loại trang: {trường: [selector, ...]}}}; một trường cũng có thể là
+    {"selectors": [...], "reorder": false} để giữ nguyên thứ tự ưu tiên thay vì tự sắp xếp theo tỉ lệ khớp.
+    Returns:
+        dict: {nguồn: {loại trang: {trường: SelectorChain}}}
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    profiles = {}
+    for source, pages in config.items():
+        profiles[source] = {}
+        for page_type, fields in pages.items():
+            profiles[source][page_type] = {}
+            for field, spec in fields.items():
+                if isinstance(spec, dict):
+                    chain = SelectorChain(spec['selectors'], reorder=spec.get('reorder', True))
+                else:
+                    chain = SelectorChain(spec)
+                profiles[source][page_type][field] = chain
+    return profiles
+
+
+PROFILES = load_profiles()
+
+
+def get_profile(source, page_type):
+    """Các SelectorChain của một loại trang ('article', 'listing') thuộc nguồn"""
+    return PROFILES[source][page_type]
+
+
+def log_selector_stats(source):
+    """Ghi log số lần khớp của từng selector, giúp phát hiện selector thừa hoặc bố cục trang đã đổi"""
+    for page_type, fields in PROFILES.get(source, {}).items():
+        for field, chain in fields.items():
+            stats = chain.stats()
+            if any(hits for _, hits in stats['order']) or stats['misses']:
+                logging.info(f"Selector {source}/{page_type}/{field}: {stats}")
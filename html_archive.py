@@ -0,0 +1,131 @@
+import glob
+import gzip
+import json
+import os
+import struct
+import threading
+import time
+import uuid
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Mỗi bản ghi: MAGIC, độ dài header, độ dài body nén, header JSON (không nén), body nén.
+# Header nằm ngoài phần nén để có thể lập chỉ mục cả kho mà không phải giải nén nội dung.
+MAGIC = b'WREC'
+RECORD_HEAD = struct.Struct('<4sII')
+SEGMENT_SUFFIX = '.arc'
+
+
+def _compress(body):
+    if zstandard is not None:
+        return 'zstd', zstandard.ZstdCompressor(level=6).compress(body)
+    return 'gzip', gzip.compress(body, compresslevel=6)
+
+
+def _decompress(codec, data):
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Bản ghi nén bằng zstd, cần cài đặt thư viện zstandard để đọc")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class HtmlArchive:
+    """
+    Kho lưu HTML thô của mọi trang bài viết tải về, chỉ ghi nối thêm, nén zstd (gzip nếu không có zstandard).
+    Mỗi tiến trình ghi vào segment riêng nên nhiều worker có thể dùng chung một thư mục kho;
+    segment đạt `max_segment_bytes` thì chuyển sang segment mới.
+    """
+
+    def __init__(self, archive_dir, max_segment_bytes=256 * 1024 * 1024):
+        self.archive_dir = archive_dir
+        self.max_segment_bytes = max_segment_bytes
+        self._lock = threading.Lock()
+        self._file = None
+        os.makedirs(archive_dir, exist_ok=True)
+
+    def _open_segment(self):
+        # Tên ngẫu nhiên: hai kho cùng thư mục (hai scraper, hai worker) không bao giờ ghi chung một file
+        name = f"segment-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:8]}{SEGMENT_SUFFIX}"
+        self._file = open(os.path.join(self.archive_dir, name), 'ab')
+
+    def append(self, url, html, source=None, category=None, status_code=200):
+        """Nén và ghi một trang vào cuối segment hiện tại"""
+        body = html.encode('utf-8') if isinstance(html, str) else html
+        codec, compressed = _compress(body)
+        header = json.dumps({
+            'url': url,
+            'source': source,
+            'category': category,
+            'status_code': status_code,
+            'fetched_at': time.time(),
+            'codec': codec,
+            'length': len(body),
+        }, ensure_ascii=False).encode('utf-8')
+        record = RECORD_HEAD.pack(MAGIC, len(header), len(compressed)) + header + compressed
+        with self._lock:
+            if self._file is None or self._file.tell() >= self.max_segment_bytes:
+                if self._file is not None:
+                    self._file.close()
+                self._open_segment()
+            self._file.write(record)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def list_segments(archive_dir):
+    return sorted(glob.glob(os.path.join(archive_dir, f"*{SEGMENT_SUFFIX}")))
+
+
+def iter_headers(path):
+    """Duyệt các bản ghi của một segment, sinh ra (offset, header) mà không giải nén nội dung"""
+    with open(path, 'rb') as f:
+        while True:
+            offset = f.tell()
+            head = f.read(RECORD_HEAD.size)
+            if len(head) < RECORD_HEAD.size:
+                return  # Hết file, hoặc bản ghi cuối bị ghi dở khi tiến trình dừng đột ngột
+            magic, header_length, body_length = RECORD_HEAD.unpack(head)
+            if magic != MAGIC:
+                raise ValueError(f"Segment hỏng tại offset {offset}: {path}")
+            header_bytes = f.read(header_length)
+            if len(header_bytes) < header_length:
+                return
+            f.seek(body_length, os.SEEK_CUR)
+            if f.tell() > os.fstat(f.fileno()).st_size:
+                return
+            yield offset, json.loads(header_bytes)
+
+
+def read_record(f, offset):
+    """Đọc bản ghi tại offset của file đã mở, trả về (header, html)"""
+    f.seek(offset)
+    _, header_length, body_length = RECORD_HEAD.unpack(f.read(RECORD_HEAD.size))
+    header = json.loads(f.read(header_length))
+    body = _decompress(header['codec'], f.read(body_length))
+    return header, body.decode('utf-8', errors='replace')
+
+
+def latest_records(archive_dir, source=None):
+    """
+    Lập chỉ mục toàn bộ kho: với mỗi url chỉ giữ bản ghi mới nhất.
+    Returns:
+        list: Các (đường dẫn segment, offset, header), nhóm theo segment và theo thứ tự offset để đọc tuần tự.
+    """
+    latest = {}
+    for path in list_segments(archive_dir):
+        for offset, header in iter_headers(path):
+            if source and header.get('source') != source:
+                continue
+            previous = latest.get(header['url'])
+            if previous is None or header['fetched_at'] >= previous[2]['fetched_at']:
+                latest[header['url']] = (path, offset, header)
+    return sorted(latest.values(), key=lambda record: (record[0], record[1]))
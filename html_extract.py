@@ -0,0 +1,239 @@
+import os
+import re
+from functools import lru_cache
+
+import soupsieve
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+
+try:
+    import lxml.html
+    from lxml import etree
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+# Các backend phân tích HTML:
+#   'lxml'         - cây lxml (C) truy vấn bằng XPath biên dịch sẵn, không dựng đối tượng BeautifulSoup
+#   'soupstrainer' - BeautifulSoup trên parser lxml, chỉ dựng cây cho vùng trang cần dùng (SoupStrainer)
+#   'html.parser'  - BeautifulSoup trên parser thuần Python, dựng cây cho toàn bộ trang (cách làm cũ)
+BACKENDS = ('lxml', 'soupstrainer', 'html.parser')
+
+_backend = os.environ.get('EXTRACT_BACKEND') or ('lxml' if HAS_LXML else 'html.parser')
+
+
+def get_backend():
+    return _backend
+
+
+def set_backend(name):
+    """Chọn backend cho toàn bộ các hàm trích xuất (cũng có thể đặt qua biến môi trường EXTRACT_BACKEND)"""
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError(f"Backend không hợp lệ: {name}, chọn một trong {BACKENDS}")
+    if name != 'html.parser' and not HAS_LXML:
+        raise ValueError(f"Backend '{name}' cần cài đặt thư viện lxml")
+    _backend = name
+
+
+def make_soup(html, only=None):
+    """
+    Phân tích HTML thành BeautifulSoup, dùng cho các trang cần duyệt cây linh hoạt.
+    Args:
+        html (str): Nội dung trang.
+        only (SoupStrainer): Chỉ giữ lại các phần tử khớp (kèm toàn bộ phần tử con), bỏ qua phần còn lại của trang.
+                             Backend 'html.parser' bỏ qua tham số này để giữ đúng hành vi cũ làm mốc so sánh.
+    """
+    if _backend == 'html.parser':
+        return BeautifulSoup(html, 'html.parser')
+    return BeautifulSoup(html, 'lxml', parse_only=only)
+
+
+def parse(html, only=None):
+    """
+    Phân tích trang theo backend đang chọn, trả về Page dùng chung cho cả BeautifulSoup và lxml.
+    only (SoupStrainer) chỉ có tác dụng với backend 'soupstrainer'.
+    """
+    if _backend == 'lxml':
+        return Page(_lxml_tree(html))
+    return Page(make_soup(html, only))
+
+
+class Page:
+    """Trang đã phân tích, root là BeautifulSoup hoặc phần tử gốc của cây lxml"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def select_text(self, chain):
+        """Text của phần tử đầu tiên khớp selector đầu tiên có kết quả trong chain, None nếu không có"""
+        element = _as_chain(chain).first(self.root)
+        return element_text(element) if element is not None else None
+
+    def select_texts(self, chain):
+        """Text của mọi phần tử khớp selector đầu tiên có kết quả trong chain"""
+        return [element_text(element) for element in _as_chain(chain).all(self.root)]
+
+    def select_items(self, chain):
+        """Mọi phần tử khớp bất kỳ selector nào trong chain, theo thứ tự xuất hiện trong trang, không trùng lặp"""
+        return _as_chain(chain).union(self.root)
+
+
+def element_text(element):
+    """get_text() cho phần tử BeautifulSoup hoặc lxml"""
+    if isinstance(element, Tag):
+        return element.get_text()
+    return _lxml_text(element)
+
+
+def element_hrefs(element):
+    """Các href của thẻ <a> bên trong phần tử, theo thứ tự xuất hiện"""
+    if isinstance(element, Tag):
+        return [a['href'] for a in element.find_all('a', href=True)]
+    return [a.get('href') for a in element.iter('a') if a.get('href') is not None]
+
+
+class SelectorChain:
+    """
+    Danh sách selector CSS dự phòng cho cùng một trường dữ liệu.
+    Selector được biên dịch một lần khi tạo chain (soupsieve cho BeautifulSoup, XPath cho lxml).
+    Mỗi lần một selector khớp, nó được đẩy lên trước selector đứng ngay trước nếu đã khớp nhiều hơn,
+    nên selector hay khớp nhất dần được thử đầu tiên. reorder=False giữ nguyên thứ tự ưu tiên trong cấu hình.
+    """
+
+    def __init__(self, selectors, reorder=True):
+        self.selectors = list(selectors)
+        self.reorder = reorder
+        self.hits = [0] * len(self.selectors)
+        self.misses = 0
+        self._order = list(range(len(self.selectors)))
+        self._soup = [soupsieve.compile(selector) for selector in self.selectors]
+        self._soup_union = soupsieve.compile(', '.join(self.selectors)) if self.selectors else None
+        if HAS_LXML:
+            xpaths = [f".{css_to_xpath(selector)}" for selector in self.selectors]
+            self._lxml_first = [etree.XPath(f"({xpath})[1]") for xpath in xpaths]
+            self._lxml_all = [etree.XPath(xpath) for xpath in xpaths]
+            self._lxml_union = etree.XPath(' | '.join(xpaths)) if xpaths else None
+
+    def first(self, node):
+        """Phần tử đầu tiên khớp selector đầu tiên có kết quả, tìm trong node; None nếu không có"""
+        is_soup = isinstance(node, Tag)
+        for position, index in enumerate(self._order):
+            if is_soup:
+                element = self._soup[index].select_one(node)
+            else:
+                found = self._lxml_first[index](node)
+                element = found[0] if found else None
+            if element is not None:
+                self._record(position)
+                return element
+        self.misses += 1
+        return None
+
+    def all(self, node):
+        """Mọi phần tử khớp selector đầu tiên có kết quả, tìm trong node"""
+        is_soup = isinstance(node, Tag)
+        for position, index in enumerate(self._order):
+            elements = self._soup[index].select(node) if is_soup else self._lxml_all[index](node)
+            if elements:
+                self._record(position)
+                return elements
+        self.misses += 1
+        return []
+
+    def union(self, node):
+        """Mọi phần tử khớp bất kỳ selector nào, chỉ duyệt cây một lần"""
+        if self._soup_union is None:
+            return []
+        if isinstance(node, Tag):
+            return self._soup_union.select(node)
+        return self._lxml_union(node)
+
+    def _record(self, position):
+        index = self._order[position]
+        self.hits[index] += 1
+        if self.reorder and position > 0 and self.hits[index] > self.hits[self._order[position - 1]]:
+            # Gán danh sách mới thay vì sửa tại chỗ để lượt duyệt đang chạy ở thread khác không bị ảnh hưởng
+            order = list(self._order)
+            order[position - 1], order[position] = order[position], order[position - 1]
+            self._order = order
+
+    def stats(self):
+        """Số lần khớp của từng selector theo thứ tự thử hiện tại, và số lần không selector nào khớp"""
+        return {'order': [(self.selectors[i], self.hits[i]) for i in self._order], 'misses': self.misses}
+
+
+def _as_chain(chain):
+    return chain if isinstance(chain, SelectorChain) else SelectorChain(chain, reorder=False)
+
+
+def _lxml_tree(html):
+    # Truyền bytes kèm encoding để lxml không đoán sai bảng mã, và không lỗi với khai báo <?xml encoding=...?>
+    parser = lxml.html.HTMLParser(encoding='utf-8')
+    return lxml.html.document_fromstring(html.encode('utf-8'), parser=parser)
+
+
+def _lxml_text(element):
+    return ''.join(_LXML_TEXT(element))
+
+
+if HAS_LXML:
+    # Giống get_text() của BeautifulSoup: bỏ qua nội dung script/style và comment
+    _LXML_TEXT = etree.XPath(".//text()[not(ancestor::script) and not(ancestor::style)]")
+
+
+def _has_class(cls):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')"
+
+
+_CSS_TOKEN = re.compile(r'''
+    \s*(?P<combinator>>)\s*
+  | (?P<space>\s+)
+  | (?P<tag>[a-zA-Z][\w-]*|\*)
+  | \.(?P<cls>[\w-]+)
+  | \#(?P<id>[\w-]+)
+  | \[(?P<attr>[\w-]+)(?:=["']?(?P<value>[^"'\]]*)["']?)?\]
+  | :not\(\.(?P<not_cls>[\w-]+)\)
+''', re.VERBOSE)
+
+
+@lru_cache(maxsize=None)
+def css_to_xpath(selector):
+    """
+    Dịch selector CSS đơn giản sang XPath: tag, .class, #id, [attr], [attr=value], :not(.class),
+    kết hợp bằng khoảng trắng (con cháu) hoặc '>' (con trực tiếp). Selector khác báo ValueError.
+    """
+    selector = selector.strip()
+    steps = []
+    axis = '//'
+    tag = None
+    conditions = []
+    position = 0
+    while position < len(selector):
+        match = _CSS_TOKEN.match(selector, position)
+        if match is None or match.end() == position:
+            raise ValueError(f"Selector CSS không được hỗ trợ: {selector}")
+        position = match.end()
+        if match.group('combinator') or match.group('space'):
+            steps.append(f"{axis}{tag or '*'}{''.join(conditions)}")
+            axis = '/' if match.group('combinator') else '//'
+            tag, conditions = None, []
+        elif match.group('tag'):
+            tag = match.group('tag')
+        elif match.group('cls'):
+            conditions.append(f"[{_has_class(match.group('cls'))}]")
+        elif match.group('id'):
+            conditions.append(f"[@id='{match.group('id')}']")
+        elif match.group('attr'):
+            value = match.group('value')
+            attr = match.group('attr')
+            conditions.append(f"[@{attr}='{value}']" if value is not None else f"[@{attr}]")
+        else:
+            conditions.append(f"[not({_has_class(match.group('not_cls'))})]")
+    steps.append(f"{axis}{tag or '*'}{''.join(conditions)}")
+    return ''.join(steps)
+
+
+# Vùng cần dùng của từng loại trang khi phân tích bằng BeautifulSoup
+VTV_ARTICLE = SoupStrainer('div', class_='noidung')
+VNECONOMY_ARTICLE = SoupStrainer(['h2', 'div'], class_=['detail__summary', 'detail__content'])
+VNECONOMY_LISTING = SoupStrainer(class_='zone zone--featured')
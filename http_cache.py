@@ -0,0 +1,143 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+class HttpCache:
+    """Cache HTTP trên đĩa: mỗi url là một cặp file .json (metadata) và .body (nội dung), khoá theo sha256 của url"""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        folder = os.path.join(self.cache_dir, key[:2])
+        return os.path.join(folder, f"{key}.json"), os.path.join(folder, f"{key}.body")
+
+    def load(self, url):
+        """Trả về (metadata, body) của url đã cache, hoặc None"""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+            return meta, body
+        except (OSError, ValueError):
+            return None
+
+    def load_meta(self, url):
+        """Chỉ đọc metadata, dùng để kiểm tra độ mới mà không phải đọc nội dung"""
+        meta_path, _ = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, url, response):
+        """Lưu một response 200 vào cache"""
+        meta = {
+            'url': url,
+            'status_code': response.status_code,
+            'headers': dict(response.headers),
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'stored_at': time.time(),
+        }
+        meta_path, body_path = self._paths(url)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        # Ghi nội dung trước rồi mới tới metadata, đổi tên nguyên tử để không bao giờ đọc phải file dở dang
+        self._write_atomic(body_path, response.content)
+        self._write_atomic(meta_path, json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+
+    def touch(self, url, meta):
+        """Làm mới thời điểm lưu sau khi server trả về 304"""
+        meta['stored_at'] = time.time()
+        meta_path, _ = self._paths(url)
+        self._write_atomic(meta_path, json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+
+    @staticmethod
+    def _write_atomic(path, data):
+        # File tạm riêng cho từng luồng: hai luồng cùng lưu một url (request hedging, asyncio.to_thread, CrawlWorker)
+        # không ghi chồng lên nhau, và mỗi os.replace chỉ đổi tên file do chính luồng đó ghi xong
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+
+class CachedSession(requests.Session):
+    """
+    requests.Session có cache trên đĩa cho các request GET.
+    Trong thời hạn `ttl` giây, response được lấy thẳng từ cache mà không gửi request;
+    quá hạn thì gửi GET có điều kiện (If-None-Match / If-Modified-Since) và dùng lại cache khi nhận 304.
+    """
+
+    def __init__(self, cache_dir, ttl=6 * 3600):
+        super().__init__()
+        self.cache = HttpCache(cache_dir)
+        self.ttl = ttl
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    def is_fresh(self, url):
+        """Url đã có trong cache và còn trong thời hạn ttl"""
+        meta = self.cache.load_meta(url)
+        return meta is not None and time.time() - meta.get('stored_at', 0) < self.ttl
+
+    def request(self, method, url, *args, **kwargs):
+        if method.upper() != 'GET' or kwargs.get('stream') or args:
+            return super().request(method, url, *args, **kwargs)
+
+        cached = self.cache.load(url)
+        if cached:
+            meta, body = cached
+            if time.time() - meta.get('stored_at', 0) < self.ttl:
+                self.hits += 1
+                return self._build_response(url, meta, body)
+            # Hết hạn: gửi request có điều kiện
+            headers = dict(kwargs.get('headers') or {})
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+            kwargs['headers'] = headers
+
+        response = super().request(method, url, **kwargs)
+        if response.status_code == 304 and cached:
+            self.revalidated += 1
+            meta, body = cached
+            self.cache.touch(url, meta)
+            return self._build_response(url, meta, body)
+
+        self.misses += 1
+        if response.status_code == 200:
+            try:
+                self.cache.save(url, response)
+            except OSError as e:
+                logging.error(f"Lỗi khi lưu cache cho {url}: {str(e)}")
+        return response
+
+    @staticmethod
+    def _build_response(url, meta, body):
+        response = requests.Response()
+        response.status_code = meta.get('status_code', 200)
+        response.headers = CaseInsensitiveDict(meta.get('headers') or {})
+        response._content = body
+        response.url = url
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.from_cache = True
+        return response
+
+    def stats(self):
+        """Số lần lấy từ cache, số lần server xác nhận 304 và số lần phải tải mới"""
+        return {'hits': self.hits, 'revalidated': self.revalidated, 'misses': self.misses}
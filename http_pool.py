@@ -0,0 +1,161 @@
+import logging
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# Số kết nối keep-alive giữ lại cho mỗi host. Phải không nhỏ hơn số request đồng thời tới một host
+# (AsyncFetcher tối đa 32), nếu không urllib3 mở kết nối dùng một lần rồi bỏ ("Connection pool is full").
+POOL_MAXSIZE = 32
+# Số host giữ pool kết nối cùng lúc
+POOL_CONNECTIONS = 16
+# Kết nối rảnh quá thời gian này (giây) thì đóng, tránh dùng lại kết nối server đã cắt
+KEEPALIVE_EXPIRY = 60
+
+_shared_adapters = {}
+_lock = threading.Lock()
+
+
+class _HttpxRaw:
+    """Đối tượng thay cho response.raw của urllib3, để iter_content() đọc theo luồng từ httpx"""
+
+    def __init__(self, response):
+        self._response = response
+
+    def stream(self, chunk_size, decode_content=True):
+        yield from self._response.iter_bytes(chunk_size)
+
+    def close(self):
+        self._response.close()
+
+    release_conn = close
+
+
+class Http2Adapter(BaseAdapter):
+    """
+    Transport adapter cho requests gửi qua httpx với HTTP/2: mọi request tới cùng một host đi chung một kết nối TLS
+    (multiplexing), không phải bắt tay lại cho mỗi request đồng thời. Server không hỗ trợ h2 thì httpx tự dùng
+    HTTP/1.1 keep-alive. Cần cài đặt `httpx[http2]`.
+    """
+
+    def __init__(self, max_connections=POOL_MAXSIZE * POOL_CONNECTIONS, keepalive_expiry=KEEPALIVE_EXPIRY):
+        super().__init__()
+        if httpx is None:
+            raise RuntimeError("Cần cài đặt httpx[http2] để dùng HTTP/2")
+        self.client = httpx.Client(
+            http2=True,
+            follow_redirects=False,  # requests.Session tự xử lý chuyển hướng
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections,
+                                keepalive_expiry=keepalive_expiry),
+        )
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        try:
+            httpx_request = self.client.build_request(request.method, request.url, headers=dict(request.headers),
+                                                      content=request.body, timeout=timeout)
+            httpx_response = self.client.send(httpx_request, stream=stream)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e), request=request)
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(str(e), request=request)
+
+        host = urlparse(request.url).netloc
+        version = httpx_response.http_version
+        with self._lock:
+            host_stats = self._stats.setdefault(host, {'requests': 0})
+            host_stats['requests'] += 1
+            host_stats[version] = host_stats.get(version, 0) + 1
+
+        response = requests.Response()
+        response.status_code = httpx_response.status_code
+        response.headers = CaseInsensitiveDict(httpx_response.headers.multi_items())
+        response.reason = httpx_response.reason_phrase
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        if stream:
+            response.raw = _HttpxRaw(httpx_response)
+        else:
+            response._content = httpx_response.read()
+            response._content_consumed = True
+            httpx_response.close()
+        return response
+
+    def stats(self):
+        """Số request theo host và theo phiên bản HTTP (HTTP/2: các request đi chung kết nối), số kết nối đang mở"""
+        with self._lock:
+            stats = {host: dict(versions) for host, versions in self._stats.items()}
+        pool = getattr(self.client._transport, '_pool', None)
+        if pool is not None:
+            stats['open_connections'] = len(pool.connections)
+        return stats
+
+    def close(self):
+        self.client.close()
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter của requests với pool kết nối keep-alive được đặt kích thước rõ ràng và thống kê số kết nối"""
+
+    def __init__(self, pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE):
+        super().__init__(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+
+    def stats(self):
+        """Số request và số kết nối TCP/TLS đã mở theo host: request/kết nối càng cao thì càng ít lần bắt tay"""
+        stats = {}
+        pools = self.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = pool.host if pool.port in (None, 80, 443) else f"{pool.host}:{pool.port}"
+            stats[host] = {'requests': pool.num_requests, 'connections': pool.num_connections}
+        return stats
+
+
+def shared_adapter(http2=False):
+    """
+    Adapter dùng chung cho cả tiến trình: các scraper (và mọi session) mount cùng một adapter thì dùng chung
+    pool kết nối theo host, thay vì mỗi session tự mở kết nối riêng.
+    """
+    with _lock:
+        if http2 and True not in _shared_adapters:
+            try:
+                _shared_adapters[True] = Http2Adapter()
+            except (RuntimeError, ImportError):
+                # httpx hoặc gói h2 chưa được cài đặt
+                logging.warning("Chưa cài đặt httpx[http2], dùng HTTP/1.1 keep-alive")
+                http2 = False
+        if not http2 and False not in _shared_adapters:
+            _shared_adapters[False] = PooledHTTPAdapter()
+        return _shared_adapters[http2]
+
+
+def configure_session(session, http2=False):
+    """Mount adapter dùng chung cho http và https của session, trả về chính session"""
+    adapter = shared_adapter(http2)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def pool_stats():
+    """Thống kê của tất cả adapter dùng chung đã tạo"""
+    with _lock:
+        adapters = list(_shared_adapters.values())
+    stats = {}
+    for adapter in adapters:
+        stats.update(adapter.stats())
+    return stats
@@ -0,0 +1,225 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+from itertools import chain
+
+from tqdm import tqdm
+
+from crawl_frontier import url_hash
+from dataset_io import BatchWriter, dataset_path, iter_dataset
+from mmap_corpus import META_FILE, CorpusWriter
+from near_dedup import NearDuplicateIndex
+
+MANIFEST_SUFFIX = '.manifest.sqlite3'
+DEDUP_SUFFIX = '.dedup.npz'
+# Kho văn bản mmap của mỗi bộ dữ liệu nằm riêng theo tên, vì nhiều nguồn có thể dùng chung một thư mục processed
+CORPUS_SUFFIX = '_corpus'
+# Các trường của bài viết thô ảnh hưởng tới kết quả làm sạch; scraped_at không nằm trong đây nên
+# thu thập lại một bài không đổi nội dung sẽ không phải xử lý lại
+HASH_FIELDS = ('url', 'source', 'category', 'title', 'pub_date', 'summary', 'content')
+
+
+def content_hash(article):
+    """Băm nội dung của một bài viết thô (các trường trong HASH_FIELDS)"""
+    digest = hashlib.blake2b(digest_size=16)
+    for field in HASH_FIELDS:
+        value = article.get(field)
+        digest.update(('' if value is None else str(value)).encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+class PreprocessManifest:
+    """
+    Sổ ghi các bài viết thô đã tiền xử lý, lưu trong SQLite cạnh bộ dữ liệu đầu ra:
+    - với mỗi url: băm nội dung của bản thô đã xử lý và bài có được giữ lại trong đầu ra hay không;
+    - phiên bản quy tắc làm sạch đã dùng, đổi phiên bản thì phải xử lý lại toàn bộ;
+    - trạng thái kho raw (RawStore.snapshot()) tại lần xử lý trước, để lần sau chỉ đọc phần mới.
+    Mọi thay đổi của một lần chạy nằm trong một giao dịch, chỉ được ghi khi commit() sau khi đầu ra đã thay xong.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS records (
+                url_hash INTEGER PRIMARY KEY,
+                url TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                kept INTEGER NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def _get(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def rules_version(self):
+        return self._get('rules_version')
+
+    def raw_state(self):
+        value = self._get('raw_state')
+        return json.loads(value) if value else None
+
+    def reset(self, rules_version):
+        """Xoá toàn bộ bản ghi để xử lý lại từ đầu với phiên bản quy tắc mới"""
+        self.conn.execute("DELETE FROM records")
+        self.conn.execute("DELETE FROM meta")
+        self._set('rules_version', rules_version)
+
+    def lookup(self, url):
+        """(băm nội dung, có được giữ lại) của lần xử lý trước, None nếu url chưa từng được xử lý"""
+        row = self.conn.execute("SELECT content_hash, kept FROM records WHERE url_hash = ?", (url_hash(url),)).fetchone()
+        return (row[0], bool(row[1])) if row else None
+
+    def record(self, url, digest, kept):
+        self.conn.execute("INSERT OR REPLACE INTO records (url_hash, url, content_hash, kept) VALUES (?, ?, ?, ?)",
+                          (url_hash(url), url, digest, 1 if kept else 0))
+
+    def kept_count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM records WHERE kept = 1").fetchone()[0]
+
+    def commit(self, raw_state):
+        self._set('raw_state', json.dumps(raw_state))
+        self.conn.commit()
+
+    def close(self):
+        # Giao dịch chưa commit (lần chạy bị lỗi giữa chừng) bị huỷ
+        self.conn.close()
+
+
+def _process(articles, clean_article, manifest, dedup, catalog, stats, replaced):
+    """Làm sạch và lọc trùng các bài mới hoặc đã đổi, trả ra các bài được giữ lại"""
+    seen = set()
+    for article in articles:
+        url = article.get('url')
+        if catalog is not None:
+            # Bổ sung vào danh mục các bài thu thập từ trước khi có danh mục
+            catalog.add(article, overwrite=False)
+        if not url or url in seen:
+            # Các file .json kiểu cũ có thể chứa cùng một url nhiều lần, giữ bản đọc được đầu tiên
+            continue
+        seen.add(url)
+        digest = content_hash(article)
+        previous = manifest.lookup(url)
+        if previous is not None and previous[0] == digest:
+            stats['unchanged'] += 1
+            continue
+        stats['changed' if previous is not None else 'new'] += 1
+        if previous is not None and previous[1]:
+            # Bản cũ của bài đang nằm trong đầu ra, phải bỏ đi dù bản mới có được giữ hay không
+            replaced.add(url)
+
+        processed_article = clean_article(article)
+        kept = False
+        if processed_article:
+            duplicate_of = dedup.add(url, processed_article['content']) if dedup is not None else None
+            # Gần trùng với chính bản cũ của nó thì là bài được cập nhật, không phải bài trùng
+            kept = duplicate_of is None or duplicate_of == url
+            if not kept:
+                stats['duplicates'] += 1
+        manifest.record(url, digest, kept)
+        if catalog is not None and (kept or url in replaced):
+            catalog.mark_processed(url, kept)
+        if kept:
+            yield processed_article
+
+
+def _write_output(output_path, corpus_dir, rows):
+    """Ghi bộ dữ liệu ra file tạm rồi đổi tên, kèm kho văn bản mmap. Trả về số bài viết"""
+    root, ext = os.path.splitext(output_path)
+    tmp_path = root + '.tmp' + ext
+    with BatchWriter(tmp_path) as writer, CorpusWriter(corpus_dir) as corpus:
+        for row in rows:
+            writer.write(row)
+            corpus.write(row)
+    os.replace(tmp_path, output_path)
+    return writer.count
+
+
+def incremental_preprocess(raw_store, clean_article, processed_dir, name, rules_version, near_dedup_threshold=0.8,
+                           catalog=None, full=False, source=None):
+    """
+    Tiền xử lý tăng dần bộ dữ liệu `name` trong `processed_dir` từ kho raw, kèm kho văn bản mmap `<name>_corpus`.
+    Chỉ các bài viết thô ghi thêm (hoặc file kiểu cũ đổi) sau lần chạy trước được đọc; trong đó bài có băm nội dung
+    trùng với lần trước được bỏ qua, chỉ bài mới hoặc đã đổi được làm sạch, lọc gần trùng (chỉ mục MinHash được lưu
+    lại giữa các lần chạy) rồi gộp vào đầu ra hiện có: bản cũ của bài đã đổi bị thay, bài mới được nối vào cuối.
+    Xử lý lại toàn bộ khi full=True, khi phiên bản quy tắc làm sạch (gồm cả ngưỡng gần trùng) khác lần trước,
+    hoặc khi thiếu file đầu ra.
+    Args:
+        clean_article: Hàm làm sạch một bài viết thô, trả về dict hoặc None nếu bỏ bài
+        rules_version: Phiên bản quy tắc làm sạch của scraper, tăng mỗi khi sửa clean_article/clean_text
+        catalog: ArticleCatalog để bổ sung bài và đánh dấu bài có trong đầu ra, None nếu không dùng
+        source: Chỉ xử lý bài của nguồn này; bắt buộc khi nhiều nguồn dùng chung một thư mục raw (vneconomy và
+                vietnamnet cùng ghi vào data/raw), nếu không mỗi nguồn sẽ gộp cả bài của nguồn kia
+    Returns:
+        int: Số bài viết trong bộ dữ liệu đầu ra
+    """
+    os.makedirs(processed_dir, exist_ok=True)
+    output_path = dataset_path(processed_dir, name)
+    corpus_dir = os.path.join(processed_dir, name + CORPUS_SUFFIX)
+    dedup_path = os.path.join(processed_dir, name + DEDUP_SUFFIX)
+    # Nguồn nằm trong phiên bản: đầu ra cũ tạo khi chưa lọc theo nguồn được xử lý lại toàn bộ
+    version = f"{rules_version}|near_dedup={near_dedup_threshold}|source={source}"
+    manifest = PreprocessManifest(os.path.join(processed_dir, name + MANIFEST_SUFFIX))
+    try:
+        reason = None
+        if full:
+            reason = "theo yêu cầu"
+        elif manifest.rules_version() != version:
+            reason = "chưa có manifest hoặc quy tắc làm sạch đã đổi"
+        elif not os.path.exists(output_path) or not os.path.exists(os.path.join(corpus_dir, META_FILE)):
+            reason = "thiếu file đầu ra"
+        elif near_dedup_threshold and not os.path.exists(dedup_path):
+            reason = "thiếu chỉ mục gần trùng"
+
+        if reason:
+            logging.info(f"Tiền xử lý lại toàn bộ dữ liệu: {reason}")
+            manifest.reset(version)
+            if catalog is not None:
+                catalog.reset_processed(source=source)
+            since = None
+            dedup = NearDuplicateIndex(threshold=near_dedup_threshold) if near_dedup_threshold else None
+        else:
+            since = manifest.raw_state()
+            dedup = NearDuplicateIndex.load(dedup_path) if near_dedup_threshold else None
+
+        # Chốt trạng thái kho trước khi đọc: bài ghi thêm trong lúc xử lý để dành cho lần sau
+        snapshot = raw_store.snapshot()
+        articles = tqdm(raw_store.iter_articles(source=source, since=since, until=snapshot), desc="Tiền xử lý dữ liệu")
+        stats = {'new': 0, 'changed': 0, 'unchanged': 0, 'duplicates': 0}
+        replaced = set()
+        kept_articles = _process(articles, clean_article, manifest, dedup, catalog, stats, replaced)
+
+        if since is None:
+            count = _write_output(output_path, corpus_dir, kept_articles)
+        else:
+            # Phần thay đổi nhỏ nên giữ trong bộ nhớ; đầu ra cũ được đọc theo luồng, bỏ các bài có bản mới
+            kept_articles = list(kept_articles)
+            if kept_articles or replaced:
+                drop = replaced | {article['url'] for article in kept_articles}
+                old_articles = (row for row in iter_dataset(output_path) if row.get('url') not in drop)
+                count = _write_output(output_path, corpus_dir, chain(old_articles, kept_articles))
+            else:
+                count = manifest.kept_count()
+
+        if dedup is not None and (since is None or stats['new'] or stats['changed']):
+            dedup.save(dedup_path)
+        # Manifest được ghi sau cùng: nếu lỗi trước đó, lần sau xử lý lại đúng phần thay đổi này
+        manifest.commit(snapshot)
+        if catalog is not None:
+            catalog.commit()
+        logging.info(f"Tiền xử lý: {stats['new']} bài mới, {stats['changed']} bài thay đổi, "
+                     f"{stats['unchanged']} bài không đổi được bỏ qua, {stats['duplicates']} bài gần trùng bị bỏ")
+        return count
+    finally:
+        manifest.close()
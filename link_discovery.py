@@ -0,0 +1,191 @@
+import logging
+import re
+import time
+import zlib
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+import xml.etree.ElementTree as ET
+
+import requests
+
+# Sitemap mặc định của từng nguồn, bổ sung cho các dòng "Sitemap:" đọc được từ robots.txt
+SITEMAPS = {
+    'vtv': ['https://vtv.vn/sitemap.xml'],
+    'vneconomy': ['https://vneconomy.vn/sitemap.xml'],
+    'vietnamnet': ['https://vietnamnet.vn/sitemap.xml'],
+}
+
+RSS_FEEDS = {
+    'vtv': ['https://vtv.vn/trang-chu.rss'],
+    'vneconomy': ['https://vneconomy.vn/tin-moi.rss'],
+    'vietnamnet': ['https://vietnamnet.vn/rss/tin-moi-nhat.rss'],
+}
+
+# Chỉ giữ lại liên kết bài viết, bỏ trang chuyên mục, tag, video...
+ARTICLE_URL_PATTERNS = {
+    'vtv': re.compile(r'^https?://vtv\.vn/.+\.htm$'),
+    'vneconomy': re.compile(r'^https?://vneconomy\.vn/[^/]+\.htm$'),
+    'vietnamnet': re.compile(r'^https?://vietnamnet\.vn/.+\.html$'),
+}
+
+
+def _local_name(tag):
+    """Bỏ namespace: '{http://www.sitemaps.org/schemas/sitemap/0.9}loc' -> 'loc'"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def normalize_date(value):
+    """Đưa lastmod (ISO 8601) hoặc pubDate (RFC 822 của RSS) về dạng ISO để so sánh chuỗi được"""
+    if not value:
+        return None
+    value = value.strip()
+    if re.match(r'^\d{4}-\d{2}-\d{2}', value):
+        return value
+    try:
+        return parsedate_to_datetime(value).isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+# Số liên kết gom lại trước mỗi lần ghi vào frontier
+ADD_BATCH = 500
+
+
+def category_from_url(url, default=None):
+    """
+    Chuyên mục là đoạn đầu của đường dẫn, ví dụ https://vtv.vn/xa-hoi/abc.htm -> xa-hoi.
+    Đường dẫn không có chuyên mục (bài vneconomy dạng https://vneconomy.vn/abc.htm) trả về default: để None thì
+    frontier lưu chuyên mục rỗng và điền lại khi trang danh sách của chuyên mục tìm thấy bài.
+    """
+    segments = [s for s in urlparse(url).path.split('/') if s]
+    return segments[0] if len(segments) >= 2 else default
+
+
+class LinkDiscovery:
+    """
+    Tìm liên kết bài viết từ sitemap XML và RSS của các nguồn, đưa thẳng vào crawl frontier kèm category và lastmod.
+    XML được đọc theo luồng bằng XMLPullParser nên sitemap lớn cũng không phải nạp hết vào bộ nhớ.
+    """
+
+    def __init__(self, session, headers, rate_limiter, frontier, timeout=30):
+        self.session = session
+        self.headers = headers
+        self.rate_limiter = rate_limiter
+        self.frontier = frontier
+        self.timeout = timeout
+
+    def discover(self, source, since=None, max_sitemaps=500):
+        """
+        Đọc sitemap và RSS của nguồn, trả về số liên kết mới được thêm vào frontier.
+        Args:
+            source (str): 'vtv', 'vneconomy' hoặc 'vietnamnet'.
+            since (str): Ngày ISO (YYYY-MM-DD), bỏ qua bài và sitemap con có lastmod cũ hơn.
+            max_sitemaps (int): Số file sitemap tối đa được tải trong một lần.
+        """
+        pattern = ARTICLE_URL_PATTERNS[source]
+        new_links = 0
+
+        # Liên kết được gom theo lô rồi ghi và commit một lần: giao dịch ghi của frontier không kéo dài qua việc tải XML
+        batch = []
+        queue = self._sitemaps_from_robots(source) + SITEMAPS.get(source, [])
+        visited = set()
+        while queue and len(visited) < max_sitemaps:
+            sitemap_url = queue.pop(0)
+            if sitemap_url in visited:
+                continue
+            visited.add(sitemap_url)
+            for kind, loc, lastmod in self._iter_xml(sitemap_url):
+                if since and lastmod and lastmod[:10] < since:
+                    continue
+                if kind == 'sitemap':
+                    queue.append(loc)
+                elif pattern.match(loc):
+                    batch.append((loc, source, category_from_url(loc), lastmod))
+                    if len(batch) >= ADD_BATCH:
+                        new_links += self.frontier.add_many(batch)
+                        batch = []
+
+        for feed_url in RSS_FEEDS.get(source, []):
+            for kind, loc, lastmod in self._iter_xml(feed_url):
+                if since and lastmod and lastmod[:10] < since:
+                    continue
+                if pattern.match(loc):
+                    batch.append((loc, source, category_from_url(loc), lastmod))
+        new_links += self.frontier.add_many(batch)
+
+        logging.info(f"Sitemap/RSS {source}: đọc {len(visited)} sitemap, thêm {new_links} liên kết mới")
+        return new_links
+
+    def _sitemaps_from_robots(self, source):
+        robots_url = f"{SITEMAPS[source][0].rsplit('/', 1)[0]}/robots.txt"
+        try:
+            response = self._request(robots_url)
+            if response.status_code != 200:
+                return []
+            return [line.split(':', 1)[1].strip() for line in response.text.splitlines()
+                    if line.lower().startswith('sitemap:')]
+        except requests.exceptions.RequestException as e:
+            logging.warning(f"Không đọc được {robots_url}: {str(e)}")
+            return []
+
+    def _request(self, url, stream=False):
+        self.rate_limiter.acquire(url)
+        start = time.monotonic()
+        try:
+            response = self.session.get(url, headers=self.headers, timeout=self.timeout, stream=stream)
+        except requests.exceptions.RequestException:
+            self.rate_limiter.record(url, None, time.monotonic() - start)
+            raise
+        self.rate_limiter.record(url, response.status_code, time.monotonic() - start,
+                                 response.headers.get('Retry-After'))
+        return response
+
+    def _iter_xml(self, url):
+        """
+        Đọc theo luồng một sitemap, sitemap index hoặc RSS, sinh ra (loại, url, lastmod):
+        loại 'sitemap' cho sitemap con, 'url' cho bài viết.
+        """
+        try:
+            response = self._request(url, stream=True)
+        except requests.exceptions.RequestException as e:
+            logging.warning(f"Không thể tải {url}: {str(e)}")
+            return
+        if response.status_code != 200:
+            logging.warning(f"Không thể truy cập {url}, mã trạng thái: {response.status_code}")
+            response.close()
+            return
+
+        # File .xml.gz được giải nén dần theo từng khối
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if url.endswith('.gz') else None
+        parser = ET.XMLPullParser(events=('end',))
+        try:
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                if decompressor is not None:
+                    chunk = decompressor.decompress(chunk)
+                parser.feed(chunk)
+                yield from self._drain(parser)
+            parser.close()
+            yield from self._drain(parser)
+        except (ET.ParseError, zlib.error) as e:
+            logging.warning(f"Lỗi khi đọc XML {url}: {str(e)}")
+        finally:
+            response.close()
+
+    @staticmethod
+    def _drain(parser):
+        for _, element in parser.read_events():
+            name = _local_name(element.tag)
+            if name not in ('sitemap', 'url', 'item'):
+                continue
+            fields = {_local_name(child.tag): (child.text or '').strip() for child in element}
+            # Giải phóng phần tử đã xử lý để bộ nhớ không tăng theo kích thước sitemap
+            element.clear()
+            if name == 'item':
+                loc = fields.get('link')
+                lastmod = normalize_date(fields.get('pubDate'))
+                name = 'url'
+            else:
+                loc = fields.get('loc')
+                lastmod = normalize_date(fields.get('lastmod'))
+            if loc:
+                yield name, loc, lastmod
@@ -0,0 +1,216 @@
+import argparse
+import json
+import mmap
+import os
+
+import numpy as np
+
+from crawl_frontier import url_hash
+from dataset_io import read_dataset
+from raw_store import RawStore
+
+BLOB_FILE = 'text.bin'
+INDEX_FILE = 'index.npy'
+LOOKUP_FILE = 'lookup.npy'
+META_FILE = 'meta.json'
+FIELDS = ('url', 'title', 'summary', 'content')
+# Bảng băm địa chỉ mở: mỗi ô là (băm url, số thứ tự bài viết), ô trống có id = -1
+LOOKUP_DTYPE = np.dtype([('hash', '<i8'), ('id', '<i8')])
+
+
+class CorpusWriter:
+    """
+    Ghi kho văn bản nhị phân theo luồng: mọi trường văn bản của mọi bài viết nối liền trong một blob UTF-8,
+    kèm chỉ mục numpy (offset, độ dài) theo từng bài và từng trường, và bảng băm url -> số thứ tự bài viết.
+    Các file được ghi ra tên tạm rồi đổi tên khi close(), nên bên đọc không bao giờ thấy kho ghi dở.
+    """
+
+    def __init__(self, corpus_dir, fields=FIELDS):
+        self.corpus_dir = corpus_dir
+        self.fields = tuple(fields)
+        self.count = 0
+        self._spans = []
+        self._hashes = []
+        self._offset = 0
+        os.makedirs(corpus_dir, exist_ok=True)
+        self._blob = open(os.path.join(corpus_dir, BLOB_FILE + '.tmp'), 'wb')
+
+    def write(self, article):
+        """Thêm một bài viết (dict), trả về số thứ tự của bài trong kho"""
+        spans = []
+        for field in self.fields:
+            value = article.get(field)
+            data = value.encode('utf-8') if isinstance(value, str) else b''
+            self._blob.write(data)
+            spans.append((self._offset, len(data)))
+            self._offset += len(data)
+        self._spans.append(spans)
+        self._hashes.append(url_hash(article.get('url') or ''))
+        self.count += 1
+        return self.count - 1
+
+    def close(self):
+        """Ghi chỉ mục và bảng băm, rồi đổi tên các file tạm thành kho hoàn chỉnh. Trả về số bài viết"""
+        if self._blob is None:
+            return self.count
+        self._blob.close()
+        self._blob = None
+
+        index = np.array(self._spans, dtype=np.int64).reshape(self.count, len(self.fields), 2)
+        self._save(INDEX_FILE, index)
+        self._save(LOOKUP_FILE, _build_lookup(self._hashes))
+        with open(os.path.join(self.corpus_dir, META_FILE + '.tmp'), 'w', encoding='utf-8') as f:
+            json.dump({'fields': list(self.fields), 'count': self.count}, f)
+        # Meta được đổi tên sau cùng: có meta mới nghĩa là blob, chỉ mục và bảng băm đều đã là bản mới
+        for name in (BLOB_FILE, INDEX_FILE, LOOKUP_FILE, META_FILE):
+            os.replace(os.path.join(self.corpus_dir, name + '.tmp'), os.path.join(self.corpus_dir, name))
+        return self.count
+
+    def abort(self):
+        """Bỏ kho đang ghi dở: xoá các file tạm, kho hiện có (nếu có) giữ nguyên"""
+        if self._blob is not None:
+            self._blob.close()
+            self._blob = None
+        for name in (BLOB_FILE, INDEX_FILE, LOOKUP_FILE, META_FILE):
+            tmp_path = os.path.join(self.corpus_dir, name + '.tmp')
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _save(self, name, array):
+        with open(os.path.join(self.corpus_dir, name + '.tmp'), 'wb') as f:
+            np.save(f, array)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Chỉ công bố kho khi ghi xong; lỗi giữa chừng thì kho cũ giữ nguyên
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def _build_lookup(hashes):
+    """Bảng băm địa chỉ mở (dò tuyến tính), kích thước là luỹ thừa của 2 và ít nhất gấp đôi số bài viết"""
+    size = 1
+    while size < max(2 * len(hashes), 8):
+        size *= 2
+    keys = np.zeros(size, dtype=np.int64)
+    ids = np.full(size, -1, dtype=np.int64)
+    mask = size - 1
+    for article_id, key in enumerate(hashes):
+        slot = key & mask
+        while ids[slot] != -1 and keys[slot] != key:
+            slot = (slot + 1) & mask
+        # Url trùng: bản ghi sau thay bản ghi trước, giống chỉ mục của kho raw
+        keys[slot] = key
+        ids[slot] = article_id
+    table = np.empty(size, dtype=LOOKUP_DTYPE)
+    table['hash'] = keys
+    table['id'] = ids
+    return table
+
+
+class MmapCorpus:
+    """
+    Đọc kho văn bản nhị phân bằng mmap: truy cập một trường của một bài viết bất kỳ là O(1) theo số thứ tự hoặc url,
+    không phải nạp cả kho. Blob và chỉ mục được ánh xạ chỉ đọc nên nhiều tiến trình mở cùng kho dùng chung
+    page cache của hệ điều hành thay vì mỗi tiến trình giữ một bản sao.
+    """
+
+    def __init__(self, corpus_dir):
+        self.corpus_dir = corpus_dir
+        with open(os.path.join(corpus_dir, META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        self.fields = meta['fields']
+        self._field_index = {field: i for i, field in enumerate(self.fields)}
+        self.index = np.load(os.path.join(corpus_dir, INDEX_FILE), mmap_mode='r')
+        self.lookup = np.load(os.path.join(corpus_dir, LOOKUP_FILE), mmap_mode='r')
+        self._file = open(os.path.join(corpus_dir, BLOB_FILE), 'rb')
+        if os.fstat(self._file.fileno()).st_size:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._mmap)
+        else:
+            # mmap không ánh xạ được file rỗng
+            self._mmap = None
+            self._view = memoryview(b'')
+
+    def __len__(self):
+        return len(self.index)
+
+    def raw(self, article_id, field):
+        """
+        Nội dung UTF-8 của một trường dưới dạng memoryview trỏ thẳng vào vùng ánh xạ, không sao chép.
+        Cần giải phóng (release) các memoryview này trước khi close() kho.
+        """
+        offset, length = self.index[article_id, self._field_index[field]]
+        return self._view[offset:offset + length]
+
+    def text(self, article_id, field):
+        """Nội dung của một trường dưới dạng chuỗi"""
+        return str(self.raw(article_id, field), 'utf-8')
+
+    def article(self, article_id):
+        return {field: self.text(article_id, field) for field in self.fields}
+
+    def find(self, url):
+        """Số thứ tự của bài viết có url này, None nếu không có"""
+        key = url_hash(url)
+        mask = len(self.lookup) - 1
+        slot = key & mask
+        while True:
+            entry_hash, article_id = self.lookup[slot]
+            if article_id == -1:
+                return None
+            if entry_hash == key:
+                return int(article_id)
+            slot = (slot + 1) & mask
+
+    def get(self, url, field=None):
+        """Bài viết (dict) hoặc một trường của bài viết theo url, None nếu không có"""
+        article_id = self.find(url)
+        if article_id is None:
+            return None
+        return self.article(article_id) if field is None else self.text(article_id, field)
+
+    def iter_field(self, field):
+        """Duyệt một trường của toàn bộ bài viết theo thứ tự trong blob (đọc tuần tự)"""
+        for article_id in range(len(self)):
+            yield self.text(article_id, field)
+
+    def close(self):
+        self._view.release()
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def build_corpus(input_path, corpus_dir, fields=FIELDS):
+    """Tạo kho từ một bộ dữ liệu đã xử lý (.parquet/.csv) hoặc từ thư mục raw. Trả về số bài viết"""
+    if os.path.isdir(input_path):
+        articles = RawStore(input_path).iter_articles()
+    else:
+        df = read_dataset(input_path)
+        df = df[[field for field in fields if field in df.columns]]
+        articles = (row._asdict() for row in df.itertuples(index=False))
+    with CorpusWriter(corpus_dir, fields) as writer:
+        for article in articles:
+            writer.write(article)
+    return writer.count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tạo kho văn bản nhị phân (mmap) từ dữ liệu đã xử lý hoặc thư mục raw")
+    parser.add_argument('input', help="File dữ liệu (.parquet/.csv) hoặc thư mục raw, ví dụ data_vtv/processed/vtv_article.parquet")
+    parser.add_argument('corpus_dir', help="Thư mục kho đầu ra, ví dụ data_vtv/processed/vtv_article_corpus")
+    args = parser.parse_args()
+
+    count = build_corpus(args.input, args.corpus_dir)
+    print(f"Đã ghi {count} bài viết vào {args.corpus_dir}")
@@ -0,0 +1,79 @@
+import argparse
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from sources import SOURCES, create_sources
+
+
+class MultiSourceCrawler:
+    """
+    Thu thập nhiều nguồn cùng lúc. Các nguồn không dùng chung host nên mỗi nguồn chạy trên một thread riêng,
+    với rate limiter và giới hạn request đồng thời theo host của chính nó; tổng tốc độ là tổng tốc độ mỗi trang cho phép.
+    """
+
+    def __init__(self, sources):
+        self.sources = sources
+
+    def run(self, num_pages=50, resume=True, incremental=False, use_sitemaps=False, since=None, preprocess=True,
+            full_preprocess=False):
+        """
+        Chạy toàn bộ các nguồn đồng thời: mỗi nguồn tìm liên kết rồi tải bài viết ngay khi xong phần của mình,
+        không chờ các nguồn khác. Trả về dict {nguồn: thời gian chạy (giây)} của các nguồn hoàn tất.
+        """
+        start_time = time.time()
+        logging.info(f"Bắt đầu thu thập đồng thời {len(self.sources)} nguồn: {[s.name for s in self.sources]}")
+        durations = {}
+        with ThreadPoolExecutor(max_workers=len(self.sources)) as executor:
+            futures = {
+                executor.submit(self._crawl_source, source, num_pages, resume, incremental, use_sitemaps,
+                                since, preprocess, full_preprocess): source
+                for source in self.sources
+            }
+            for future in as_completed(futures):
+                source = futures[future]
+                try:
+                    durations[source.name] = future.result()
+                    logging.info(f"Nguồn {source.name} hoàn tất sau {durations[source.name] / 60:.2f} phút")
+                except Exception as e:
+                    logging.error(f"Lỗi khi thu thập nguồn {source.name}: {str(e)}")
+        logging.info(f"Đã hoàn thành thu thập tất cả các nguồn trong {(time.time() - start_time) / 60:.2f} phút")
+        return durations
+
+    @staticmethod
+    def _crawl_source(source, num_pages, resume, incremental, use_sitemaps, since, preprocess, full_preprocess):
+        start_time = time.time()
+        try:
+            if source.collect_links(num_pages, resume=resume, incremental=incremental,
+                                    use_sitemaps=use_sitemaps, since=since) is False:
+                raise ConnectionError(f"không kết nối được tới {source.host}")
+            source.claim_articles(since=since)
+        finally:
+            # Kể cả khi bị dừng giữa chừng, các liên kết đã thu thập vẫn được ghi xuống đĩa
+            source.commit()
+        if preprocess:
+            source.preprocess(full=full_preprocess)
+        return time.time() - start_time
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Thu thập đồng thời các nguồn tin tức")
+    parser.add_argument('--sources', nargs='+', choices=list(SOURCES), default=list(SOURCES))
+    parser.add_argument('--pages', type=int, default=50, help="Số trang danh sách tối đa mỗi chuyên mục")
+    parser.add_argument('--incremental', action='store_true', help="Chỉ tải các trang có bài mới")
+    parser.add_argument('--no-resume', action='store_true', help="Bắt đầu lại từ trang đầu thay vì tiếp tục lần chạy dở")
+    parser.add_argument('--sitemaps', action='store_true', help="Lấy liên kết từ sitemap/RSS trước")
+    parser.add_argument('--since', default=None, help="Bỏ qua bài có lastmod cũ hơn ngày này (YYYY-MM-DD)")
+    parser.add_argument('--max-per-host', type=int, default=4)
+    parser.add_argument('--hedge', action='store_true', help="Gửi bản sao cho request chậm hơn p95 của host")
+    parser.add_argument('--http2', action='store_true', help="Dùng HTTP/2 (cần cài đặt httpx[http2])")
+    parser.add_argument('--no-preprocess', action='store_true', help="Không tiền xử lý sau khi thu thập")
+    parser.add_argument('--full-preprocess', action='store_true',
+                        help="Tiền xử lý lại toàn bộ dữ liệu thô thay vì chỉ phần mới hoặc đã đổi")
+    args = parser.parse_args()
+
+    crawler = MultiSourceCrawler(create_sources(args.sources, max_per_host=args.max_per_host,
+                                                hedge_requests=args.hedge, http2=args.http2))
+    crawler.run(num_pages=args.pages, resume=not args.no_resume, incremental=args.incremental,
+                use_sitemaps=args.sitemaps, since=args.since, preprocess=not args.no_preprocess,
+                full_preprocess=args.full_preprocess)
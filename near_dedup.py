@@ -0,0 +1,184 @@
+import argparse
+import logging
+import os
+import time
+import zlib
+
+import numpy as np
+
+from dataset_io import read_dataset, write_dataset
+
+MAX_HASH = np.uint64(0xFFFFFFFF)
+SHIFT = np.uint64(32)
+
+
+class NearDuplicateIndex:
+    """
+    Phát hiện bài viết gần trùng bằng MinHash + LSH, xây dựng dần theo luồng bài viết.
+    - Nội dung được tách thành các shingle `shingle_size` từ liên tiếp; chữ ký MinHash gồm `num_perm` giá trị
+      32 bit, xác suất hai chữ ký trùng ở một vị trí bằng độ tương đồng Jaccard của hai tập shingle.
+    - Chữ ký được chia thành `bands` dải; hai bài có chung ít nhất một dải thì là ứng viên, ứng viên được xác nhận
+      khi tỉ lệ vị trí trùng của hai chữ ký (ước lượng Jaccard) đạt `threshold`.
+    - Chỉ lưu chữ ký và bảng băm các dải, không lưu nội dung: khoảng num_perm * 4 + bands * 100 byte mỗi bài
+      (~1.7 KB với mặc định), vài trăm nghìn bài vẫn nằm gọn trong bộ nhớ.
+    Bài bị xác định là trùng không được thêm vào chỉ mục, bài giữ lại đầu tiên đại diện cho cả nhóm.
+    """
+
+    def __init__(self, threshold=0.8, num_perm=64, bands=16, shingle_size=5, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm phải chia hết cho bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self._seed = seed
+        rng = np.random.RandomState(seed)
+        # Họ hàm băm nhân-dịch (a * x + b) mod 2^64 >> 32 với a lẻ: không cần phép chia lấy dư
+        self._a = (rng.randint(0, 1 << 64, size=num_perm, dtype=np.uint64) | np.uint64(1))[:, None]
+        self._b = rng.randint(0, 1 << 64, size=num_perm, dtype=np.uint64)[:, None]
+        self._band_mult = rng.randint(1, 1 << 62, size=self.rows, dtype=np.uint64) | np.uint64(1)
+        self._band_salt = rng.randint(0, 1 << 62, size=bands, dtype=np.uint64)
+        self._word_hashes = {}
+        self._buckets = {}
+        self._signatures = np.empty((1024, num_perm), dtype=np.uint32)
+        self.keys = []
+        self.duplicates = 0
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _shingles(self, text):
+        """Băm các shingle của văn bản thành mảng uint64 (giá trị 32 bit), băm theo từ rồi cuộn theo cửa sổ"""
+        words = text.lower().split()
+        if not words:
+            return None
+        cache = self._word_hashes
+        hashes = list(map(cache.get, words))
+        if None in hashes:
+            if len(cache) > 500000:
+                # Bộ nhớ đệm băm từ chỉ để tăng tốc, xoá khi quá lớn để bộ nhớ không tăng mãi
+                cache.clear()
+            for word in words:
+                if word not in cache:
+                    cache[word] = zlib.crc32(word.encode('utf-8')) | 1
+            hashes = list(map(cache.get, words))
+        word_hashes = np.array(hashes, dtype=np.uint64)
+        k = min(self.shingle_size, len(words))
+        shingles = np.zeros(len(words) - k + 1, dtype=np.uint64)
+        for offset in range(k):
+            # Phép nhân/cộng uint64 tràn số theo modulo 2^64, đúng như mong muốn cho hàm băm
+            shingles = shingles * np.uint64(1000003) + word_hashes[offset:offset + len(shingles)]
+        return np.unique((shingles >> SHIFT) ^ (shingles & MAX_HASH))
+
+    def signature(self, text):
+        """Chữ ký MinHash (mảng uint32 num_perm phần tử) của văn bản, None nếu văn bản rỗng"""
+        shingles = self._shingles(text or '')
+        if shingles is None:
+            return None
+        hashed = (self._a * shingles[None, :] + self._b) >> SHIFT
+        return hashed.min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature):
+        bands = signature.reshape(self.bands, self.rows).astype(np.uint64)
+        return ((bands * self._band_mult).sum(axis=1) ^ self._band_salt).tolist()
+
+    def query(self, signature):
+        """Số thứ tự của bài đã có trong chỉ mục gần trùng với chữ ký này (Jaccard ước lượng cao nhất), None nếu không có"""
+        best, best_score = None, self.threshold
+        for candidate in {self._buckets[key] for key in self._band_keys(signature) if key in self._buckets}:
+            score = np.count_nonzero(self._signatures[candidate] == signature) / self.num_perm
+            if score >= best_score:
+                best, best_score = candidate, score
+        return best
+
+    def insert(self, key, signature):
+        article_id = len(self.keys)
+        if article_id == len(self._signatures):
+            self._signatures = np.concatenate([self._signatures, np.empty_like(self._signatures)])
+        self._signatures[article_id] = signature
+        self.keys.append(key)
+        for band_key in self._band_keys(signature):
+            # Mỗi dải chỉ giữ bài đầu tiên: bài sau cùng dải hoặc là bản trùng (bị bỏ), hoặc vẫn so được qua dải khác
+            self._buckets.setdefault(band_key, article_id)
+        return article_id
+
+    def add(self, key, text):
+        """
+        Kiểm tra rồi thêm một bài viết vào chỉ mục.
+        Returns:
+            Khoá (url) của bài đã có mà bài này gần trùng, hoặc None nếu bài mới được thêm vào chỉ mục
+        """
+        signature = self.signature(text)
+        if signature is None:
+            return None
+        duplicate_of = self.query(signature)
+        if duplicate_of is not None:
+            self.duplicates += 1
+            return self.keys[duplicate_of]
+        self.insert(key, signature)
+        return None
+
+    def save(self, path):
+        """Lưu chỉ mục (tham số, chữ ký và khoá) ra file .npz để lần tiền xử lý sau nối tiếp mà không băm lại bài cũ"""
+        params = np.array([self.threshold, self.num_perm, self.bands, self.shingle_size, self._seed], dtype=np.float64)
+        keys = np.frombuffer('\n'.join(self.keys).encode('utf-8'), dtype=np.uint8)
+        with open(path + '.tmp', 'wb') as f:
+            np.savez(f, params=params, signatures=self._signatures[:len(self.keys)], keys=keys)
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path):
+        """Nạp chỉ mục đã lưu bằng save(), bảng băm các dải được dựng lại từ chữ ký"""
+        with np.load(path) as data:
+            threshold, num_perm, bands, shingle_size, seed = data['params'].tolist()
+            index = cls(threshold=threshold, num_perm=int(num_perm), bands=int(bands),
+                        shingle_size=int(shingle_size), seed=int(seed))
+            signatures = data['signatures']
+            keys = bytes(data['keys']).decode('utf-8').split('\n') if len(signatures) else []
+        for key, signature in zip(keys, signatures):
+            index.insert(key, signature)
+        return index
+
+
+def dedupe_datasets(paths, threshold=0.8, drop=False, report_path=None):
+    """
+    Tìm bài gần trùng giữa nhiều bộ dữ liệu đã xử lý (ví dụ VTV và vneconomy), theo thứ tự các file:
+    bài ở file trước được giữ, bài gần trùng ở file sau bị đánh dấu. drop=True ghi đè từng file, bỏ các bài trùng.
+    Returns:
+        list: Các cặp (file, url bị trùng, url được giữ)
+    """
+    index = NearDuplicateIndex(threshold=threshold)
+    pairs = []
+    for path in paths:
+        start_time = time.time()
+        df = read_dataset(path)
+        keep = []
+        for url, content in zip(df['url'], df['content']):
+            duplicate_of = index.add(url, content if isinstance(content, str) else '')
+            keep.append(duplicate_of is None)
+            if duplicate_of is not None:
+                pairs.append((path, url, duplicate_of))
+        removed = len(keep) - sum(keep)
+        logging.info(f"{path}: {removed}/{len(df)} bài gần trùng ({time.time() - start_time:.1f} giây)")
+        if drop and removed:
+            write_dataset(df[keep], path)
+    if report_path:
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write("file,url,duplicate_of\n")
+            for path, url, duplicate_of in pairs:
+                f.write(f"{path},{url},{duplicate_of}\n")
+    return pairs
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Tìm bài viết gần trùng giữa các bộ dữ liệu đã xử lý bằng MinHash LSH")
+    parser.add_argument('datasets', nargs='+', help="Các file .parquet/.csv, bài ở file trước được ưu tiên giữ lại")
+    parser.add_argument('--threshold', type=float, default=0.8, help="Ngưỡng Jaccard ước lượng để coi là trùng")
+    parser.add_argument('--drop', action='store_true', help="Ghi đè các file, bỏ các bài gần trùng")
+    parser.add_argument('--report', default=None, help="Ghi danh sách cặp trùng ra file CSV")
+    args = parser.parse_args()
+
+    pairs = dedupe_datasets(args.datasets, threshold=args.threshold, drop=args.drop, report_path=args.report)
+    print(f"Tìm thấy {len(pairs)} bài gần trùng")
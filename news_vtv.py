@@ -2,25 +2,38 @@ import csv
 import re
 
 import requests
-import pandas as pd
 import time
-import random
 import os
 import json
 from datetime import datetime
 
-from bs4 import BeautifulSoup
-from tqdm import tqdm
 import logging
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from DemoEachFunction import demoTakeLinkPerPage
-
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.wait import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from article_catalog import ArticleCatalog
+from async_fetcher import AsyncFetcher
+from crawl_frontier import CrawlFrontier
+from crawl_journal import CrawlJournal, reached_known_articles
+from dataset_io import dataset_path, find_dataset, read_dataset, write_dataset
+from extraction_profiles import get_profile
+from html_archive import HtmlArchive
+from html_extract import VTV_ARTICLE, parse
+from http_cache import CachedSession
+from http_pool import configure_session, pool_stats
+from incremental_preprocess import incremental_preprocess
+from link_discovery import LinkDiscovery
+from rate_limiter import AdaptiveRateLimiter
+from raw_store import RawStore
+from retry_policy import PERMANENT, CircuitBreaker, RetryPolicy
+from vtv_timeline import VtvTimelineFetcher
+
+try:
+    from browser_pool import BrowserPool
+except ImportError:
+    # selenium không bắt buộc: timeline được đọc bằng HTTP, trình duyệt chỉ là phương án dự phòng
+    BrowserPool = None
 
 # Thiết lập logging
 logging.basicConfig(
@@ -33,9 +46,44 @@ logging.basicConfig(
 )
 
 
+def extract_vtv_article(html, url, category):
+    """Trích xuất sapo và nội dung từ HTML của một bài viết vtv"""
+    # Chỉ cần khối nội dung bài viết
+    page = parse(html, only=VTV_ARTICLE)
+    profile = get_profile('vtv', 'article')
+    detail_summary = page.select_text(profile['summary'])
+    detail_content = page.select_text(profile['content'])
+    if detail_summary is None or detail_content is None:
+        logging.warning(f"Không tìm thấy sapo hoặc nội dung trong {url}")
+        return None
+    return {
+        'category': category,
+        'url': url,
+        'source': 'vtv',
+        'scraped_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'summary': detail_summary.strip(),
+        'content': detail_content.strip()
+    }
+
+
 class NewsScraperVTV:
-    def __init__(self, output_dir="data_vtv"):
+    # Phiên bản quy tắc làm sạch (clean_article, clean_text): tăng khi sửa để lần tiền xử lý sau làm lại toàn bộ
+    CLEANING_RULES_VERSION = 1
+
+    def __init__(self, output_dir="data_vtv", max_per_host=4, cache_ttl=6 * 3600, browser_pool_size=3,
+                 use_browser_fallback=True, parse_workers=None, archive_html=True,
+                 hedge_requests=False, http2=False):
         self.output_dir = output_dir
+        # Số request bài viết đồng thời tối đa cho mỗi host
+        self.max_per_host = max_per_host
+        # Số tiến trình phân tích HTML bài viết (None = số nhân CPU, 0 = không dùng tiến trình riêng)
+        self.parse_workers = parse_workers
+        # Gửi bản sao cho request bài viết chậm hơn p95 của host để cắt đuôi độ trễ
+        self.hedge_requests = hedge_requests
+        # Số chuyên mục được mở rộng song song, cũng là số trình duyệt headless tối đa khi phải dùng selenium
+        self.browser_pool_size = browser_pool_size
+        # Chỉ mở trình duyệt khi timeline không đọc được bằng HTTP
+        self.use_browser_fallback = use_browser_fallback
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
@@ -49,7 +97,17 @@ class NewsScraperVTV:
             'Upgrade-Insecure-Requests': '1',
             'Cache-Control': 'max-age=0',
         }
-        self.session = requests.Session()
+        # Cache HTTP trên đĩa: chạy lại trong thời hạn cache_ttl không phải tải lại trang
+        self.session = CachedSession(os.path.join(output_dir, "http_cache"), ttl=cache_ttl)
+        # Pool kết nối keep-alive dùng chung giữa các scraper trong tiến trình, HTTP/2 nếu bật và server hỗ trợ
+        configure_session(self.session, http2=http2)
+        # Giới hạn tốc độ theo host, dùng chung cho trang danh sách và trang bài viết
+        self.rate_limiter = AdaptiveRateLimiter()
+        # Thử lại lỗi tạm thời với backoff trong giới hạn ngân sách chung, ngắt host đang sập thay vì dội request vào
+        self.retry_policy = RetryPolicy()
+        self.circuit_breaker = CircuitBreaker()
+        # Thu thập liên kết timeline bằng HTTP thuần, không cần trình duyệt
+        self.timeline_fetcher = VtvTimelineFetcher(self._get)
         try:
             # Tạo thư mục đầu ra nếu chưa tồn tại
             os.makedirs(output_dir, exist_ok=True)
@@ -58,15 +116,40 @@ class NewsScraperVTV:
         except Exception as e:
             logging.error(f"Lỗi khi tạo thư mục: {str(e)}")
             sys.exit(1)
+        # Hàng đợi url bài viết + tập url đã thấy, giữ lại giữa các lần chạy
+        self.frontier = CrawlFrontier(os.path.join(output_dir, "frontier.sqlite3"))
+        # Danh mục bài viết (siêu dữ liệu + chỉ mục toàn văn) để lọc, tìm kiếm mà không quét lại toàn bộ dữ liệu
+        self.catalog = ArticleCatalog(os.path.join(output_dir, "catalog.sqlite3"))
+        # Dữ liệu thô: các shard JSON Lines chỉ ghi nối thêm trong thư mục raw, ghi theo nhóm
+        self.raw_store = RawStore(os.path.join(output_dir, "raw"), source="vtv")
+        # Nhật ký tiến độ các trang danh sách để tiếp tục khi bị dừng giữa chừng
+        self.journal = CrawlJournal(os.path.join(output_dir, "frontier.sqlite3"))
+        # Tìm liên kết bài viết từ sitemap/RSS thay cho phần lớn các trang danh sách
+        self.link_discovery = LinkDiscovery(self.session, self.headers, self.rate_limiter, self.frontier)
+        # Kho HTML thô nén của các trang bài viết, dùng để trích xuất lại (replay_archive.py) khi đổi selector
+        self.html_archive = HtmlArchive(os.path.join(output_dir, "html_archive")) if archive_html else None
 
     '''
     Truy cập từng chủ đề, mỗi chủ đề báo có nhiều trang nên ta phải truy lùng từng chủ đề và từng trang
     '''
 
-    def scrape_vtv(self, num_pages):
-        """Thu thập dữ liệu từ vtv"""
+    def scrape_vtv(self, num_pages, resume=True, incremental=False, use_sitemaps=False, since=None):
+        """
+        Thu thập dữ liệu từ vtv, incremental=True ngừng cuộn timeline khi chỉ còn bài đã biết.
+        use_sitemaps=True lấy liên kết từ sitemap/RSS trước (chỉ các bài có lastmod từ ngày since, YYYY-MM-DD),
+        sau đó trang danh sách chạy ở chế độ tăng dần để bổ sung những bài sitemap còn thiếu.
+        """
+        if not self.collect_links(num_pages, resume=resume, incremental=incremental,
+                                  use_sitemaps=use_sitemaps, since=since):
+            return
+        self.claim_articles(since=since)
+
+    def collect_links(self, num_pages, resume=True, incremental=False, use_sitemaps=False, since=None):
+        """
+        Giai đoạn tìm liên kết: sitemap/RSS và các trang danh sách, đưa liên kết bài viết vào frontier.
+        Trả về False nếu không kết nối được tới nguồn.
+        """
         logging.info("Bắt đầu thu thập dữ liệu từ VTV")
-        article_links = []
 
         categories = [
             #"chinh-tri"
@@ -75,103 +158,115 @@ class NewsScraperVTV:
         ]
 
         try:
-            response = self.session.get("https://vtv.vn", timeout=10, headers=self.headers)
+            # Kiểm tra kết nối bằng trang danh sách đầu tiên thay vì trang chủ: response được lưu vào cache HTTP nên
+            # vòng thu thập bên dưới không phải tải lại, không tốn request riêng chỉ để kiểm tra
+            response = self._get(f"https://vtv.vn/{categories[0]}.htm", timeout=10)
             if response.status_code != 200:
                 logging.error(f"Không thể kết nối đến VTV: Mã trạng thái {response.status_code}")
-                return None
+                return False
             logging.info("Kết nối thành công đến vtv.vn")
         except requests.exceptions.RequestException as e:
             logging.error(f"Không thể kết nối đến VTV: {str(e)}")
-            return None
+            return False
 
-        for category in categories:
-            try:
-                url_to_try = f"https://vtv.vn/{category}.htm"
-                logging.info(f"Đang thử truy cập: {url_to_try}")
+        number_of_links = 0
+        if use_sitemaps:
+            self.link_discovery.discover('vtv', since=since)
+            incremental = True
 
-                response = self.session.get(url_to_try, headers=self.headers, timeout=15)
-                if response.status_code != 200:
-                    logging.warning(f"Không thể truy cập trang {url_to_try}, mã trạng thái: {response.status_code}")
-                    continue
+        self.journal.start_run('vtv', resume=resume)
+        # Mỗi chuyên mục VTV là một timeline cuộn vô hạn, ghi nhận như trang 1
+        pending_categories = [c for c in categories if not self.journal.is_page_done('vtv', c, 1)]
 
-                logging.info(f"Truy cập thành công: {url_to_try}")
-
-                options = Options()
-                options.add_argument("--headless")
-                options.add_argument("--disable-gpu")
-                options.add_argument("--window-size=1920,1080")
-
-                driver = webdriver.Chrome(options=options)
-                driver.get(url_to_try)
-                time.sleep(15)
-
-                last_height = driver.execute_script("return document.body.scrollHeight")
-
-                for _ in range(10):
-                    # Cuộn xuống cuối trang
-                    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                    time.sleep(8)
-
-                    # Thử click vào nút "Xem thêm" nếu có
+        # Các chuyên mục được mở rộng song song; trình duyệt trong pool chỉ được khởi tạo khi thực sự cần
+        browser_pool = None
+        if self.use_browser_fallback and BrowserPool is not None:
+            browser_pool = BrowserPool(size=self.browser_pool_size)
+        try:
+            with ThreadPoolExecutor(max_workers=self.browser_pool_size) as executor:
+                futures = {
+                    executor.submit(self._collect_category_links, browser_pool, category, incremental,
+                                    num_pages): category
+                    for category in pending_categories
+                }
+                for future in as_completed(futures):
+                    category = futures[future]
                     try:
-                        xem_them = WebDriverWait(driver, 2).until(
-                            EC.element_to_be_clickable((By.XPATH, "//a[contains(text(),'Xem thêm')]"))
-                        )
-                        driver.execute_script("arguments[0].scrollIntoView(true);", xem_them)
-                        time.sleep(1)
-                        driver.execute_script("arguments[0].click();", xem_them)
-                        time.sleep(2)
-                    except:
-                        pass  # Không thấy hoặc không click được nút
-
-                    new_height = driver.execute_script("return document.body.scrollHeight")
-                    if new_height == last_height:
-                        break
-                    last_height = new_height
-
-                # Lấy tất cả liên kết bài viết
-                articles = driver.find_elements(By.XPATH, "//div[@class='list_news timeline']//a[@href]")
-                links = [a.get_attribute('href') for a in articles if a.get_attribute('href').endswith('.htm')]
-                driver.quit()
-
-                links_not_http = list(set(links))
-
-                if not links_not_http:
-                    logging.warning(f"Không thu thập được liên kết nào từ chuyên mục {category}")
-                    continue
-
-                for href in links_not_http:
-                    if not href.startswith('http'):
-                        if href.startswith('/'):
-                            href = f"https://vtv.vn{href}"
-                        else:
-                            href = f"https://vtv.vn/{href}"
-
-                    if not any(item['url'] == href for item in article_links):
-                        article_links.append({
-                            'url': href,
-                            'source': 'vtv',
-                            'category': category
-                        })
-
-                logging.info(f"Đã thu thập {len(article_links)} liên kết từ vtv - chuyên mục {category}")
-                time.sleep(random.uniform(2, 4))
-
-            except Exception as e:
-                logging.error(f"Lỗi khi thu thập liên kết từ chuyên mục {category}: {str(e)}")
-                time.sleep(random.uniform(5, 10))
+                        links_not_http = future.result()
+                    except Exception as e:
+                        logging.error(f"Lỗi khi thu thập liên kết từ chuyên mục {category}: {str(e)}")
+                        continue
+
+                    if not links_not_http:
+                        logging.warning(f"Không thu thập được liên kết nào từ chuyên mục {category}")
+                        continue
+
+                    for href in links_not_http:
+                        if not href.startswith('http'):
+                            if href.startswith('/'):
+                                href = f"https://vtv.vn{href}"
+                            else:
+                                href = f"https://vtv.vn/{href}"
+
+                        # Kiểm tra trùng lặp bằng tập băm của frontier, O(1) cho mỗi liên kết
+                        if self.frontier.add(href, 'vtv', category):
+                            number_of_links += 1
+                    self.frontier.commit()
+                    self.journal.mark_page_done('vtv', category, 1, len(links_not_http))
+                    self.journal.update_watermark('vtv', category, links_not_http[0])
+
+                    logging.info(f"Đã thu thập {number_of_links} liên kết mới từ vtv - chuyên mục {category}")
+        finally:
+            if browser_pool is not None:
+                browser_pool.close()
+        return True
+
+    def claim_articles(self, since=None):
+        """Giai đoạn tải bài viết: tải và trích xuất các liên kết còn chờ trong frontier"""
+        # Frontier chỉ chứa liên kết duy nhất, kể cả các liên kết còn dở từ lần chạy trước
+        unique_links = self.frontier.pending('vtv', since=since)
+        logging.info(f"Tổng số liên kết duy nhất chưa thu thập: {len(unique_links)}")
 
-        # Loại bỏ liên kết trùng
-        unique_links = []
-        unique_urls = set()
-        for link in article_links:
-            if link['url'] not in unique_urls:
-                unique_urls.add(link['url'])
-                unique_links.append(link)
+        self._claim_content(unique_links)
 
-        logging.info(f"Tổng số liên kết duy nhất: {len(unique_links)}")
+    def _collect_category_links(self, browser_pool, category, incremental, max_pages):
+        """
+        Mở rộng timeline của một chuyên mục, trả về các liên kết bài viết.
+        Ưu tiên tải các trang timeline bằng HTTP; chỉ mượn trình duyệt trong pool khi cách đó không dùng được.
+        """
+        url_to_try = f"https://vtv.vn/{category}.htm"
+        logging.info(f"Đang thử truy cập: {url_to_try}")
 
-        self._claim_content(unique_links)
+        response = self._get(url_to_try)
+        if response.status_code != 200:
+            logging.warning(f"Không thể truy cập trang {url_to_try}, mã trạng thái: {response.status_code}")
+            return []
+        logging.info(f"Truy cập thành công: {url_to_try}")
+
+        should_stop = None
+        if incremental:
+            watermark = self.journal.get_watermark('vtv', category)
+
+            def should_stop(loaded):
+                # Chỉ xét các liên kết vừa được nạp thêm sau lần cuộn trước; liên kết từ sitemap chưa có chuyên mục
+                # vẫn tính là mới, như khi add vào frontier
+                new_links = sum(1 for href in loaded if self.frontier.is_new(href))
+                if reached_known_articles(loaded, new_links, watermark):
+                    logging.info(f"Chuyên mục {category}: timeline chỉ còn bài đã biết, dừng cuộn")
+                    return True
+                return False
+
+        response.encoding = 'utf-8'
+        links = self.timeline_fetcher.collect(response.text, max_pages=max_pages, should_stop=should_stop)
+        if links is not None:
+            return links
+
+        if browser_pool is None:
+            logging.warning(f"Không đọc được timeline chuyên mục {category} bằng HTTP và không có trình duyệt dự phòng")
+            return []
+        logging.info(f"Chuyên mục {category}: không đọc được timeline bằng HTTP, chuyển sang trình duyệt")
+        self.rate_limiter.acquire(url_to_try)
+        return browser_pool.expand_timeline(url_to_try, max_steps=10, should_stop=should_stop)
 
     def _save_links_to_csv(self, links, filename="article_links.csv"):
         """
@@ -198,112 +293,108 @@ class NewsScraperVTV:
 
     def _claim_content(self, unique_links):
         ''', filename="article_links.csv"'''
-        number_of_claim_article = 0
-        # Thu thập nội dung từ các liên kết
-        for article_info in tqdm(unique_links, desc="Thu thập bài viết vtv"):
-            try:
-                article_data = self._scrape_vtv_article(article_info['url'], article_info['category'])
-                if article_data:
-                    number_of_claim_article += 1
-                    # Lưu dữ liệu thô
-                    self._save_raw_article(article_data)
-                    time.sleep(random.uniform(1, 3))
-            except Exception as e:
-                logging.error(f"Lỗi khi thu thập bài viết từ {article_info['url']}: {str(e)}")
+        # Thu thập nội dung từ các liên kết, nhiều bài viết được tải cùng lúc
+        fetcher = AsyncFetcher(self.session, self.headers, max_per_host=self.max_per_host,
+                               rate_limiter=self.rate_limiter, parse_workers=self.parse_workers,
+                               archive=self.html_archive, retry_policy=self.retry_policy,
+                               circuit_breaker=self.circuit_breaker, hedge_requests=self.hedge_requests)
+        number_of_claim_article = fetcher.fetch_all(
+            unique_links, extract_vtv_article, self._store_article, desc="Thu thập bài viết vtv",
+            on_failure=self._drop_article
+        )
+        self._flush_raw_store()
         logging.info(f"Đã hoàn thành thu thập dữ liệu từ VTV: {number_of_claim_article} bài viết")
-
-    def _scrape_vtv_article(self, url, category):
-        """Thu thập thông tin từ một bài viết vtv"""
-        max_retries = 3
-        retry_count = 0
-
-        while retry_count < max_retries:
+        logging.info(f"Tốc độ hiện tại theo host (request/giây): {self.rate_limiter.rates()}")
+        logging.info(f"Thống kê cache HTTP: {self.session.stats()}")
+        logging.info(f"Kết nối HTTP theo host: {pool_stats()}")
+        self.journal.finish_run('vtv')
+
+    def _get(self, url, timeout=15):
+        """Gửi GET qua cầu dao và bộ giới hạn tốc độ theo host, lỗi tạm thời được thử lại với backoff"""
+        if self.session.is_fresh(url):
+            # Trang còn hạn trong cache, không có request nào tới host
+            return self.session.get(url, headers=self.headers, timeout=timeout)
+        return self.retry_policy.call(self._send, url, self.circuit_breaker, timeout=timeout)
+
+    def _send(self, url, timeout=15):
+        """Một lần gửi GET: chờ lượt của rate limiter và ghi nhận kết quả để điều chỉnh tốc độ"""
+        self.rate_limiter.acquire(url)
+        start = time.monotonic()
+        try:
+            response = self.session.get(url, headers=self.headers, timeout=timeout)
+        except requests.exceptions.RequestException:
+            self.rate_limiter.record(url, None, time.monotonic() - start)
+            raise
+        self.rate_limiter.record(url, response.status_code, time.monotonic() - start,
+                                 response.headers.get('Retry-After'))
+        return response
+
+    def _drop_article(self, article_info, outcome):
+        """Liên kết lỗi vĩnh viễn (404, 410...) được đánh dấu FAILED để các lần chạy sau không tải lại"""
+        if outcome == PERMANENT:
+            self.frontier.mark_failed(article_info['url'])
+
+    def _store_article(self, article_data):
+        """Lưu bài viết vào kho dữ liệu thô"""
+        # Liên kết chỉ được đánh dấu DONE khi nhóm chứa bài viết đã được ghi bền xuống đĩa
+        self._mark_group(self.raw_store.append(article_data))
+
+    def _flush_raw_store(self):
+        """Ghi nốt nhóm bài viết đang chờ trong kho thô"""
+        self._mark_group(self.raw_store.flush())
+
+    def _mark_group(self, stored_group):
+        """
+        Đánh dấu một nhóm bài vừa được ghi bền vào kho thô, rồi commit danh mục ngay: các nguồn dùng chung file
+        danh mục qua các kết nối riêng, giữ giao dịch ghi mở qua nhiều nhóm sẽ làm nguồn kia bị khoá.
+        """
+        for stored in stored_group:
+            self._mark_stored(stored)
+        if stored_group:
             try:
-                response = self.session.get(url, headers=self.headers, timeout=15)
-                if response.status_code != 200:
-                    logging.warning(f"Không thể truy cập {url}, mã trạng thái: {response.status_code}")
-                    retry_count += 1
-                    time.sleep(random.uniform(2, 5))
-                    continue
-                # Cạo dữ liệu 1 link Web bài viết cụ thể
-                response.encoding = 'utf-8'  # Đảm bảo encoding đúng
-                soup = BeautifulSoup(response.text, 'html.parser')
-                detail_summary = soup.find('div', class_='noidung').find('h2', class_='sapo').get_text().strip()
-                detail_content = soup.find('div', class_='noidung').find('div', class_='ta-justify').get_text().strip()
-                #print(detail_summary)
-                #print(detail_content)
-
-                return {
-                    'category': category,
-                    'url': url,
-                    'source': 'vtv',
-                    'scraped_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    'summary': detail_summary,
-                    'content': detail_content
-                }
-            except requests.exceptions.RequestException as e:
-                retry_count += 1
-                logging.warning(f"Lỗi kết nối khi thu thập bài viết (lần {retry_count}/{max_retries}): {url}")
-                if retry_count == max_retries:
-                    logging.error(f"Lỗi khi thu thập bài viết sau {max_retries} lần thử: {url}")
-                    return None
-                time.sleep(random.uniform(3, 6))
+                self.catalog.commit()
             except Exception as e:
-                logging.error(f"Lỗi không xác định khi xử lý bài viết {url}: {str(e)}")
-                return None
-        return None
+                logging.error(f"Lỗi khi ghi danh mục bài viết: {str(e)}")
 
-    def _save_raw_article(self, article_data):
-        """Lưu dữ liệu thô của một bài viết"""
+    def _mark_stored(self, article_data):
+        self.frontier.mark_done(article_data['url'])
         try:
-            filename = f"{article_data['source']}_{int(time.time())}_{article_data['category']}.json"
-            with open(os.path.join(self.output_dir, "raw", filename), 'w', encoding='utf-8') as f:
-                json.dump(article_data, f, ensure_ascii=False, indent=2)
+            self.catalog.add(article_data)
         except Exception as e:
-            logging.error(f"Lỗi khi lưu dữ liệu thô: {str(e)}")
+            # Danh mục chỉ là chỉ mục phụ (bổ sung lại được khi tiền xử lý), lỗi ở đây không được chặn việc
+            # đánh dấu các bài còn lại của nhóm
+            logging.error(f"Lỗi khi thêm bài viết {article_data['url']} vào danh mục: {str(e)}")
+        self.journal.set_watermark_date(article_data['source'], article_data['category'], article_data['url'],
+                                        article_data.get('pub_date') or article_data['scraped_at'])
 
-    def preprocess_data(self):
-        """Tiền xử lý dữ liệu đã thu thập"""
+    def preprocess_data(self, near_dedup_threshold=0.8, full=False):
+        """
+        Tiền xử lý dữ liệu đã thu thập, tăng dần: chỉ các bài viết thô mới hoặc đã đổi từ lần trước được làm sạch
+        và gộp vào bộ dữ liệu đã xử lý (xem incremental_preprocess). Đổi CLEANING_RULES_VERSION khi sửa quy tắc
+        làm sạch để lần sau xử lý lại toàn bộ; full=True để buộc xử lý lại toàn bộ.
+        near_dedup_threshold: bỏ các bài gần trùng (cùng một tin đăng ở nhiều chuyên mục) có độ tương đồng Jaccard
+        ước lượng từ ngưỡng này trở lên, để cùng một tin không rơi vào cả tập train và test. None để tắt.
+        """
         logging.info("Bắt đầu tiền xử lý dữ liệu")
-        fail = 0
         try:
-            data = self.load_raw_data()
-            processed_data = []
-            for article in tqdm(data, desc="Tiền xử lý dữ liệu"):
-                processed_article = self.clean_article(article)
-                if processed_article:
-                    fail += 1
-                    processed_data.append(processed_article)
-
-            # Lưu dữ liệu đã xử lý
-            df = pd.DataFrame(processed_data)
-            df.to_csv(os.path.join(self.output_dir, "processed", "vtv_article.csv"), index=False, encoding='utf-8')
-
-            logging.info(f"Đã hoàn thành tiền xử lý dữ liệu: {len(processed_data)} bài viết")
-            logging.info(f"Đã hỏng tiền xử lý dữ liệu: {fail} bài viết")
-            return len(processed_data)
+            # Ngoài file dữ liệu còn có kho văn bản mmap (processed/vtv_article_corpus) để đọc ngẫu nhiên từng bài
+            processed_dir = os.path.join(self.output_dir, "processed")
+            processed_count = incremental_preprocess(self.raw_store, self.clean_article, processed_dir, "vtv_article",
+                                                     self.CLEANING_RULES_VERSION, near_dedup_threshold,
+                                                     catalog=self.catalog, full=full, source="vtv")
+            logging.info(f"Đã hoàn thành tiền xử lý dữ liệu: {processed_count} bài viết")
+            return processed_count
         except Exception as e:
             logging.error(f"Lỗi trong quá trình tiền xử lý dữ liệu: {str(e)}")
             return []
 
-    def load_raw_data(self):
-        """Đọc dữ liệu thô từ thư mục raw"""
+    def load_raw_data(self, source=None, category=None):
+        """
+        Đọc dữ liệu thô từ kho shard (và các file .json kiểu cũ còn lại) trong thư mục raw.
+        Trả về generator: các file được đọc và giải mã song song trên nhiều luồng, bài viết được trả ra ngay khi đọc xong.
+        """
         logging.info("Đọc dữ liệu thô từ thư mục")
-        data = []
-        raw_dir = os.path.join(self.output_dir, "raw")
-        num=0
-        for filename in os.listdir(raw_dir):
-            if filename.endswith('.json'):
-                try:
-                    with open(os.path.join(raw_dir, filename), 'r', encoding='utf-8') as f:
-                        num += 1
-                        article_data = json.load(f)
-                        data.append(article_data)
-                except Exception as e:
-                    logging.error(f"Lỗi khi đọc file {filename}: {str(e)}")
-        logging.info(f"Đã đọc {len(data)} bài viết từ thư mục raw")
-        logging.info(f"đọc {num} file json")
-        return data
+        return self.raw_store.iter_articles(source=source, category=category)
 
     def clean_article(self, article):
         """Làm sạch dữ liệu của một bài viết"""
@@ -403,16 +494,13 @@ class NewsScraperVTV:
         logging.info("Bắt đầu chia tập dữ liệu")
 
         try:
-            # Đọc dữ liệu đã tách từ
-            tokenized_file = os.path.join(self.output_dir, "processed", "tokenized_articles.csv")
-            if os.path.exists(tokenized_file):
-                df = pd.read_csv(tokenized_file, encoding='utf-8')
-            else:
-                processed_file = os.path.join(self.output_dir, "processed", "old_all_articles.csv")
-                if not os.path.exists(processed_file):
-                    logging.error("Không tìm thấy file dữ liệu đã xử lý")
-                    return
-                df = pd.read_csv(processed_file, encoding='utf-8')
+            # Đọc dữ liệu đã tách từ, nếu chưa có thì đọc dữ liệu đã xử lý (Parquet hoặc CSV)
+            processed_dir = os.path.join(self.output_dir, "processed")
+            dataset_file = find_dataset(processed_dir, "tokenized_articles") or find_dataset(processed_dir, "old_all_articles")
+            if dataset_file is None:
+                logging.error("Không tìm thấy file dữ liệu đã xử lý")
+                return
+            df = read_dataset(dataset_file)
 
             # Xáo trộn dữ liệu
             df = df.sample(frac=1, random_state=42).reset_index(drop=True)
@@ -427,9 +515,9 @@ class NewsScraperVTV:
             test_df = df[val_idx:]
 
             # Lưu các tập dữ liệu
-            train_df.to_csv(os.path.join(self.output_dir, "train", "train.csv"), index=False, encoding='utf-8')
-            val_df.to_csv(os.path.join(self.output_dir, "validation", "validation.csv"), index=False, encoding='utf-8')
-            test_df.to_csv(os.path.join(self.output_dir, "test", "test.csv"), index=False, encoding='utf-8')
+            write_dataset(train_df, dataset_path(os.path.join(self.output_dir, "train"), "train"))
+            write_dataset(val_df, dataset_path(os.path.join(self.output_dir, "validation"), "validation"))
+            write_dataset(test_df, dataset_path(os.path.join(self.output_dir, "test"), "test"))
 
             # Ghi thông tin về kích thước các tập dữ liệu
             logging.info(f"Kích thước tập huấn luyện: {len(train_df)} bài viết")
@@ -453,12 +541,21 @@ class NewsScraperVTV:
         except Exception as e:
             logging.error(f"Lỗi trong quá trình chia tập dữ liệu: {str(e)}")
 
-    def run_scraper(self, target_count=2000, pages_per_source=100):
-        """Chạy toàn bộ quá trình thu thập và xử lý dữ liệu"""
+    def run_scraper(self, target_count=2000, pages_per_source=100, resume=True, incremental=False, use_sitemaps=False, since=None):
+        """
+        Chạy toàn bộ quá trình thu thập và xử lý dữ liệu, mặc định tiếp tục lần chạy dở trước đó.
+        incremental=True dùng cho lần cập nhật hằng ngày: mỗi chuyên mục chỉ cuộn tới khi gặp bài đã biết.
+        use_sitemaps=True lấy liên kết từ sitemap/RSS trước, since (YYYY-MM-DD) bỏ qua các bài cũ hơn.
+        """
         start_time = time.time()
         logging.info(f"Bắt đầu quá trình thu thập dữ liệu với mục tiêu {target_count} bài viết")
-        # Thu thập dữ liệu từ các nguồn tin tức
-        self.scrape_vtv(num_pages=pages_per_source)
+        try:
+            # Thu thập dữ liệu từ các nguồn tin tức
+            self.scrape_vtv(num_pages=pages_per_source, resume=resume, incremental=incremental,
+                          use_sitemaps=use_sitemaps, since=since)
+        finally:
+            # Kể cả khi bị KeyboardInterrupt, các liên kết đã thu thập vẫn được ghi xuống đĩa
+            self.frontier.commit()
         end_time = time.time()
         logging.info(f"Đã hoàn thành toàn bộ quá trình trong {(end_time - start_time) / 60:.2f} phút")
 
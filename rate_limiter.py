@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """Token bucket cho một host: mỗi request lấy một token, token được nạp lại theo `rate` token/giây"""
+
+    def __init__(self, rate, capacity=1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+
+    def reserve(self):
+        """Lấy một token và trả về số giây cần chờ trước khi được gửi request"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        # Token có thể âm: các request đến sau xếp hàng phía sau request trước
+        self.tokens -= 1
+        wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+        return max(wait, self.paused_until - now)
+
+    def try_take(self):
+        """Lấy một token chỉ khi có sẵn ngay, không xếp hàng; trả về True nếu lấy được"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens < 1 or now < self.paused_until:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class AdaptiveRateLimiter:
+    """
+    Giới hạn tốc độ theo từng host, tự điều chỉnh theo kiểu AIMD:
+    tăng dần tốc độ khi host trả lời nhanh và thành công,
+    giảm mạnh khi gặp 429/5xx, lỗi kết nối hoặc độ trễ tăng đột biến.
+    """
+
+    def __init__(self, initial_rate=0.5, min_rate=0.05, max_rate=5.0, increase_step=0.05,
+                 decrease_factor=0.5, latency_spike=2.5, burst=1.0):
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        # Độ trễ lớn hơn latency_spike lần độ trễ trung bình được coi là bất thường
+        self.latency_spike = latency_spike
+        self.burst = burst
+        self._buckets = {}
+        self._latency = {}
+        self._last_decrease = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _host(url):
+        return urlparse(url).netloc or url
+
+    def _bucket(self, host):
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(self.initial_rate, self.burst)
+        return self._buckets[host]
+
+    def _reserve(self, url):
+        with self._lock:
+            return self._bucket(self._host(url)).reserve()
+
+    def acquire(self, url):
+        """Chờ (chặn luồng) cho đến khi được phép gửi request tới host của url"""
+        wait = self._reserve(url)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, url):
+        """Phiên bản asyncio của acquire, chỉ tác vụ hiện tại phải chờ"""
+        wait = self._reserve(url)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def try_acquire(self, url):
+        """Không chờ: chỉ được gửi nếu host còn token ngay lúc này (dùng cho request phụ như hedging)"""
+        with self._lock:
+            return self._bucket(self._host(url)).try_take()
+
+    def record(self, url, status_code, latency, retry_after=None):
+        """
+        Ghi nhận kết quả một request để điều chỉnh tốc độ của host.
+        Args:
+            url (str): Url đã gửi request.
+            status_code (int): Mã trạng thái, None nếu lỗi kết nối.
+            latency (float): Thời gian phản hồi (giây).
+            retry_after (str): Giá trị header Retry-After nếu có.
+        """
+        host = self._host(url)
+        with self._lock:
+            bucket = self._bucket(host)
+            avg_latency = self._latency.get(host)
+            self._latency[host] = latency if avg_latency is None else 0.8 * avg_latency + 0.2 * latency
+
+            overloaded = status_code is None or status_code == 429 or status_code >= 500
+            slow = avg_latency is not None and latency > self.latency_spike * avg_latency
+            if not overloaded and not slow:
+                bucket.rate = min(self.max_rate, bucket.rate + self.increase_step)
+                return
+
+            now = time.monotonic()
+            if retry_after and str(retry_after).isdigit():
+                bucket.paused_until = max(bucket.paused_until, now + int(retry_after))
+            # Chỉ giảm một lần trong mỗi khoảng 1/rate để một loạt lỗi liên tiếp không đẩy tốc độ về đáy
+            if now - self._last_decrease.get(host, 0.0) < 1.0 / bucket.rate:
+                return
+            self._last_decrease[host] = now
+            old_rate = bucket.rate
+            bucket.rate = max(self.min_rate, bucket.rate * self.decrease_factor)
+            reason = f"mã trạng thái {status_code}" if overloaded else f"độ trễ {latency:.2f}s"
+            logging.warning(f"Giảm tốc độ {host}: {old_rate:.2f} -> {bucket.rate:.2f} request/giây ({reason})")
+
+    def current_rate(self, url_or_host):
+        """Tốc độ hiện tại (request/giây) của một host"""
+        host = self._host(url_or_host)
+        with self._lock:
+            return self._bucket(host).rate
+
+    def rates(self):
+        """Tốc độ hiện tại của tất cả các host đã gặp"""
+        with self._lock:
+            return {host: round(bucket.rate, 3) for host, bucket in self._buckets.items()}
@@ -0,0 +1,430 @@
+import argparse
+import glob
+import json
+import logging
+import os
+import shutil
+import struct
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from crawl_frontier import url_hash
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SHARD_DIR = 'shards'
+SHARD_SUFFIX = '.jsonl'
+INDEX_SUFFIX = '.idx'
+# Mỗi mục chỉ mục: băm url (int64), offset trong shard, độ dài dòng JSON
+INDEX_ENTRY = struct.Struct('<qQI')
+# Mỗi tác vụ đọc của luồng con: một đoạn shard khoảng chừng này byte, hoặc chừng này file .json kiểu cũ
+READ_CHUNK_BYTES = 4 * 1024 * 1024
+LEGACY_BATCH = 64
+
+
+def _loads(data):
+    """Giải mã JSON bằng orjson nếu có (nhanh hơn vài lần), không thì dùng json của thư viện chuẩn"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class RawStore:
+    """
+    Kho dữ liệu thô dạng JSON Lines chỉ ghi nối thêm, chia thành các shard.
+    - Mỗi tiến trình ghi vào shard riêng (tên ngẫu nhiên), shard đạt `max_shard_bytes` thì chuyển sang shard mới,
+      nên nhiều scraper/worker dùng chung thư mục mà không bao giờ ghi đè nhau.
+    - Group commit: bài viết được gom trong bộ nhớ rồi ghi một lần và fsync khi đủ `group_size` bài hoặc sau
+      `flush_interval` giây; append()/flush() trả về các bài vừa được ghi bền để bên gọi mới đánh dấu DONE.
+    - Mỗi shard có file chỉ mục .idx (băm url -> offset, độ dài) để đọc một bài bất kỳ bằng một lần seek.
+      Dòng cuối bị ghi dở (tiến trình dừng đột ngột) không có ký tự xuống dòng và bị bỏ qua khi đọc.
+    File .json cũ (mỗi bài một file) trong thư mục raw vẫn được đọc, cho tới khi chuyển sang shard bằng migrate().
+    `source` (nếu có) được ghi vào tên shard để khi đọc có thể lọc theo nguồn mà không phải mở file.
+    """
+
+    def __init__(self, raw_dir, source=None, max_shard_bytes=64 * 1024 * 1024, group_size=64, flush_interval=1.0):
+        self.raw_dir = raw_dir
+        self.source = source
+        self.shard_dir = os.path.join(raw_dir, SHARD_DIR)
+        self.max_shard_bytes = max_shard_bytes
+        self.group_size = group_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self._shard = None
+        self._index = None
+        # Phần của mỗi shard đã nạp vào chỉ mục: {đường dẫn: (số byte đã đọc của file .idx, số byte dữ liệu đã phủ)}
+        self._indexed = {}
+        self._index_file = None
+        os.makedirs(self.shard_dir, exist_ok=True)
+
+    def append(self, article):
+        """
+        Thêm một bài viết vào nhóm chờ ghi.
+        Returns:
+            list: Các bài viết đã được ghi bền xuống đĩa trong lần gọi này (rỗng nếu nhóm chưa đầy)
+        """
+        with self._lock:
+            self._pending.append(article)
+            if len(self._pending) < self.group_size and time.monotonic() - self._last_flush < self.flush_interval:
+                return []
+            return self._flush_locked()
+
+    def flush(self):
+        """Ghi ngay các bài đang chờ, trả về các bài vừa được ghi bền"""
+        with self._lock:
+            return self._flush_locked()
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return []
+        articles, self._pending = self._pending, []
+        if self._shard is None or self._shard.tell() >= self.max_shard_bytes:
+            self._open_shard()
+
+        lines = []
+        entries = []
+        offset = data_start = self._shard.tell()
+        index_start = self._index_file.tell()
+        for article in articles:
+            line = (json.dumps(article, ensure_ascii=False) + '\n').encode('utf-8')
+            lines.append(line)
+            entries.append(INDEX_ENTRY.pack(url_hash(article['url']), offset, len(line)))
+            offset += len(line)
+        # Dữ liệu được ghi và fsync trước chỉ mục: chỉ mục không bao giờ trỏ tới dữ liệu chưa có trên đĩa
+        self._shard.write(b''.join(lines))
+        self._shard.flush()
+        os.fsync(self._shard.fileno())
+        self._index_file.write(b''.join(entries))
+        self._index_file.flush()
+        if self._index is not None:
+            for article, entry in zip(articles, entries):
+                _, entry_offset, length = INDEX_ENTRY.unpack(entry)
+                self._index[url_hash(article['url'])] = (self._shard.name, entry_offset, length)
+            if self._indexed.get(self._shard.name, (0, 0)) == (index_start, data_start):
+                # Chỉ mục đã phủ tới trước lần ghi này: lần làm mới sau không phải đọc lại các mục vừa ghi
+                self._indexed[self._shard.name] = (self._index_file.tell(), self._shard.tell())
+        return articles
+
+    def _open_shard(self):
+        self._close_files()
+        prefix = f"shard-{self.source}" if self.source else "shard"
+        name = f"{prefix}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._shard = open(os.path.join(self.shard_dir, name + SHARD_SUFFIX), 'ab')
+        self._index_file = open(os.path.join(self.shard_dir, name + INDEX_SUFFIX), 'ab')
+
+    def _close_files(self):
+        for f in (self._shard, self._index_file):
+            if f is not None:
+                f.close()
+        self._shard = self._index_file = None
+
+    def close(self):
+        """Ghi nốt các bài đang chờ và đóng shard, trả về các bài vừa được ghi bền"""
+        with self._lock:
+            articles = self._flush_locked()
+            self._close_files()
+        return articles
+
+    def shards(self):
+        return sorted(glob.glob(os.path.join(self.shard_dir, f"*{SHARD_SUFFIX}")))
+
+    def legacy_files(self):
+        """Các file .json kiểu cũ (mỗi bài một file) còn trong thư mục raw"""
+        return sorted(glob.glob(os.path.join(self.raw_dir, '*.json')))
+
+    def index(self):
+        """
+        Chỉ mục toàn kho {băm url: (đường dẫn shard, offset, độ dài)}, bản ghi mới nhất của mỗi url được giữ lại.
+        Mỗi lần gọi nạp thêm phần mới của các shard: shard mới và phần ghi thêm của shard do tiến trình khác
+        (scraper khác dùng chung thư mục raw, các crawl worker) ghi sau lần nạp trước. Shard không lớn thêm thì
+        không phải mở lại.
+        """
+        with self._lock:
+            if self._index is None:
+                self._index = {}
+            for path in self.shards():
+                index_start, data_start = self._indexed.get(path, (0, 0))
+                if data_start and os.path.getsize(path) <= data_start:
+                    continue
+                entries, index_end, data_end = _read_shard_index(path, index_start, data_start)
+                for key, offset, length in entries:
+                    self._index[key] = (path, offset, length)
+                self._indexed[path] = (index_end, data_end)
+            return self._index
+
+    def __contains__(self, url):
+        return url_hash(url) in self.index()
+
+    def __len__(self):
+        return len(self.index())
+
+    def get(self, url):
+        """Đọc một bài viết theo url bằng một lần seek, None nếu không có"""
+        location = self.index().get(url_hash(url))
+        if location is None:
+            return None
+        path, offset, length = location
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.read(length))
+
+    def snapshot(self):
+        """
+        Trạng thái hiện tại của kho, dùng cho xử lý tăng dần: kích thước mỗi shard tính tới dòng hoàn chỉnh cuối cùng
+        (shard chỉ ghi nối thêm nên phần trước kích thước này không bao giờ đổi) và (kích thước, mtime) của
+        mỗi file .json kiểu cũ. Khoá là tên file.
+        """
+        shards = {os.path.basename(path): _complete_size(path) for path in self.shards()}
+        legacy = {os.path.basename(filename): _file_identity(filename) for filename in self.legacy_files()}
+        return {'shards': shards, 'legacy': legacy}
+
+    def iter_articles(self, source=None, category=None, workers=4, since=None, until=None):
+        """
+        Duyệt toàn bộ bài viết dạng generator: các shard (mỗi url chỉ lấy bản ghi mới nhất), sau đó các file .json
+        kiểu cũ chưa có trong shard. Việc đọc và giải mã chạy trên `workers` luồng theo từng đoạn shard / nhóm file,
+        nhưng chỉ tối đa 2 * workers đoạn nằm trong bộ nhớ cùng lúc, nên bên gọi xử lý được ngay từ những bài đầu tiên
+        và bộ nhớ không tăng theo kích thước kho.
+        Lọc theo nguồn/chuyên mục được áp dụng trên tên file trước khi mở (shard có tên nguồn, file kiểu cũ có dạng
+        <nguồn>_<thời gian>_<chuyên mục>.json), rồi trên từng dòng trước khi giải mã.
+        since/until là các snapshot(): chỉ đọc phần shard ghi thêm và các file kiểu cũ mới hoặc đã đổi sau `since`,
+        tính tới thời điểm `until`.
+        """
+        index = self.index()
+        since_shards = since['shards'] if since else {}
+        since_legacy = since['legacy'] if since else {}
+        tasks = []
+        for path in self.shards():
+            name = os.path.basename(path)
+            if source and _shard_source(path) not in (None, source):
+                continue
+            if until is not None and name not in until['shards']:
+                continue
+            end = until['shards'][name] if until is not None else None
+            tasks.extend((_read_shard_chunk, (path, start, end, index, source, category))
+                         for start, end in _shard_chunks(path, since_shards.get(name, 0), end))
+        legacy = []
+        for filename in self.legacy_files():
+            name = os.path.basename(filename)
+            if until is not None and name not in until['legacy']:
+                continue
+            if name in since_legacy:
+                identity = until['legacy'][name] if until is not None else _file_identity(filename)
+                if identity == since_legacy[name]:
+                    continue  # File không đổi từ lần trước
+            if _legacy_name_matches(filename, source, category):
+                legacy.append(filename)
+        for i in range(0, len(legacy), LEGACY_BATCH):
+            tasks.append((_read_legacy_batch, (legacy[i:i + LEGACY_BATCH], index, source, category)))
+
+        tasks = iter(tasks)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            while True:
+                # Giữ tối đa 2 * workers tác vụ đang chạy hoặc chờ lấy kết quả, trả kết quả theo đúng thứ tự
+                while len(pending) < 2 * workers:
+                    task = next(tasks, None)
+                    if task is None:
+                        break
+                    fn, args = task
+                    pending.append(executor.submit(fn, *args))
+                if not pending:
+                    return
+                yield from pending.popleft().result()
+
+    def migrate(self, remove=True):
+        """
+        Chuyển các file .json kiểu cũ vào shard. Các file đã chuyển được xoá (remove=True) hoặc giữ lại trong
+        thư mục raw/legacy. Trả về số bài viết đã chuyển.
+        """
+        legacy_dir = os.path.join(self.raw_dir, 'legacy')
+        migrated = 0
+        handled = []
+        for filename in self.legacy_files():
+            try:
+                with open(filename, 'r', encoding='utf-8') as f:
+                    article = json.load(f)
+            except Exception as e:
+                logging.error(f"Lỗi khi đọc file {filename}, giữ nguyên file: {str(e)}")
+                continue
+            if not article.get('url'):
+                continue
+            if article['url'] not in self:
+                self.append(article)
+                migrated += 1
+            handled.append(filename)
+        # Chỉ dọn file cũ khi toàn bộ bài viết đã được ghi bền vào shard
+        self.close()
+        for filename in handled:
+            if remove:
+                os.remove(filename)
+            else:
+                os.makedirs(legacy_dir, exist_ok=True)
+                shutil.move(filename, os.path.join(legacy_dir, os.path.basename(filename)))
+        return migrated
+
+
+def _shard_source(path):
+    """Nguồn ghi trong tên shard (shard-<nguồn>-<thời gian>-...), None với shard không ghi nguồn"""
+    name = os.path.basename(path)[len('shard-'):]
+    first = name.split('-', 1)[0]
+    return None if first.isdigit() else first
+
+
+def _legacy_name_matches(filename, source, category):
+    """
+    Lọc file .json kiểu cũ theo tên: <nguồn>_<thời gian>_<chuyên mục>.json. Tên có phần cuối là số ngẫu nhiên
+    (vietnamnet) không cho biết chuyên mục, những file đó được mở và lọc theo nội dung.
+    """
+    parts = os.path.basename(filename)[:-len('.json')].split('_', 2)
+    if len(parts) < 3:
+        return True
+    if source and parts[0] != source:
+        return False
+    if category and not parts[2].isdigit() and parts[2] != category:
+        return False
+    return True
+
+
+def _matches(article, source, category):
+    return (not source or article.get('source') == source) and (not category or article.get('category') == category)
+
+
+def _file_identity(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _complete_size(path, block=65536):
+    """Kích thước shard tính tới hết dòng hoàn chỉnh cuối cùng (bỏ dòng cuối đang ghi dở nếu có)"""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        end = size
+        while end > 0:
+            start = max(0, end - block)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b'\n')
+            if newline != -1:
+                return start + newline + 1
+            end = start
+    return 0
+
+
+def _shard_chunks(path, start=0, size=None, chunk_bytes=READ_CHUNK_BYTES):
+    """
+    Chia đoạn [start, size) của shard thành các đoạn (start, end) khoảng chunk_bytes,
+    ranh giới luôn nằm ngay sau một dòng. start phải là đầu một dòng.
+    """
+    if size is None:
+        size = os.path.getsize(path)
+    chunks = []
+    with open(path, 'rb') as f:
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            f.readline()
+            end = min(f.tell(), size)
+            chunks.append((start, end))
+            start = end
+    return chunks
+
+
+def _read_shard_chunk(path, start, end, index, source, category):
+    """Đọc và giải mã một đoạn shard (chạy trong luồng con), chỉ giữ bản ghi mới nhất của mỗi url"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    # Lọc thô trên byte trước khi giải mã: bản ghi do kho này ghi luôn có dạng "khoá": "giá trị"
+    needles = [f'"{key}": {json.dumps(value, ensure_ascii=False)}'.encode('utf-8')
+               for key, value in (('source', source), ('category', category)) if value]
+    articles = []
+    offset = start
+    for line in data.splitlines(keepends=True):
+        line_offset = offset
+        offset += len(line)
+        if not line.endswith(b'\n'):
+            break  # Dòng cuối bị ghi dở
+        if not all(needle in line for needle in needles):
+            continue
+        try:
+            article = _loads(line)
+        except ValueError as e:
+            logging.error(f"Bỏ qua dòng hỏng tại offset {line_offset} của {path}: {str(e)}")
+            continue
+        location = index.get(url_hash(article.get('url', '')))
+        if location is not None and (location[0], location[1]) != (path, line_offset):
+            continue
+        if _matches(article, source, category):
+            articles.append(article)
+    return articles
+
+
+def _read_legacy_batch(filenames, index, source, category):
+    """Đọc và giải mã một nhóm file .json kiểu cũ (chạy trong luồng con), bỏ các bài đã có trong shard"""
+    articles = []
+    for filename in filenames:
+        try:
+            with open(filename, 'rb') as f:
+                article = _loads(f.read())
+        except Exception as e:
+            logging.error(f"Lỗi khi đọc file {filename}: {str(e)}")
+            continue
+        if url_hash(article.get('url', '')) not in index and _matches(article, source, category):
+            articles.append(article)
+    return articles
+
+
+def _read_shard_index(path, index_start=0, data_start=0):
+    """
+    Đọc chỉ mục của một shard, từ byte `index_start` của file .idx và byte `data_start` của dữ liệu trở đi.
+    Phần cuối shard chưa có trong chỉ mục (tiến trình dừng hoặc đang ghi giữa lúc ghi dữ liệu và ghi chỉ mục)
+    hoặc shard mất file chỉ mục được khôi phục bằng cách quét các dòng hoàn chỉnh.
+    Returns:
+        tuple: (các mục (băm url, offset, độ dài), số byte .idx đã đọc, số byte dữ liệu đã phủ)
+    """
+    entries = []
+    index_end = index_start
+    index_path = path[:-len(SHARD_SUFFIX)] + INDEX_SUFFIX
+    try:
+        with open(index_path, 'rb') as f:
+            f.seek(index_start)
+            data = f.read()
+        usable = len(data) - len(data) % INDEX_ENTRY.size
+        entries = [entry for entry in INDEX_ENTRY.iter_unpack(data[:usable]) if entry[1] >= data_start]
+        index_end += usable
+    except OSError:
+        pass
+
+    end = max((offset + length for _, offset, length in entries), default=data_start)
+    if end < os.path.getsize(path):
+        with open(path, 'rb') as f:
+            f.seek(end)
+            offset = end
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    entries.append((url_hash(json.loads(line).get('url', '')), offset, len(line)))
+                except ValueError:
+                    pass
+                offset += len(line)
+            end = offset
+    return entries, index_end, end
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chuyển dữ liệu thô kiểu cũ (mỗi bài một file .json) sang shard")
+    parser.add_argument('raw_dir', help="Thư mục raw, ví dụ data/raw")
+    parser.add_argument('--keep', action='store_true', help="Giữ file cũ trong raw/legacy thay vì xoá")
+    args = parser.parse_args()
+
+    store = RawStore(args.raw_dir)
+    count = store.migrate(remove=not args.keep)
+    print(f"Đã chuyển {count} bài viết vào {store.shard_dir}, kho hiện có {len(store)} bài")
@@ -0,0 +1,108 @@
+import argparse
+import json
+import logging
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from tqdm import tqdm
+
+from html_archive import latest_records, read_record
+from sources import SOURCES, source_for_url
+
+
+def _replay_chunk(path, offsets):
+    """
+    Trích xuất lại một nhóm bản ghi liền nhau của cùng một segment (chạy trong tiến trình con).
+    Returns:
+        list: Các (nguồn, dữ liệu bài viết hoặc None)
+    """
+    results = []
+    with open(path, 'rb') as f:
+        for offset in offsets:
+            try:
+                header, html = read_record(f, offset)
+            except Exception as e:
+                # Bản ghi hỏng không làm mất cả nhóm: các offset sau vẫn đọc được độc lập
+                logging.error(f"Lỗi khi đọc bản ghi {path}@{offset}: {str(e)}")
+                results.append((None, None))
+                continue
+            source = header.get('source') or source_for_url(header['url'])
+            if source not in SOURCES:
+                results.append((source, None))
+                continue
+            try:
+                article = SOURCES[source].extract(html, header['url'], header.get('category'))
+            except Exception as e:
+                logging.error(f"Lỗi khi trích xuất lại {header['url']}: {str(e)}")
+                article = None
+            results.append((source, article))
+    return results
+
+
+def replay_archive(archive_dir, output_path, source=None, workers=None, chunk_size=200):
+    """
+    Chạy lại bước trích xuất trên toàn bộ kho HTML thô, không gửi request nào tới trang báo.
+    Mỗi url chỉ lấy bản tải mới nhất; các bản ghi được chia thành từng nhóm theo segment để mỗi tiến trình
+    đọc tuần tự một đoạn file. Bài viết được ghi ra output_path dạng JSON Lines.
+    Returns:
+        Counter: Số bài trích xuất được theo nguồn
+    """
+    start_time = time.time()
+    records = latest_records(archive_dir, source=source)
+    logging.info(f"Kho {archive_dir}: {len(records)} trang cần trích xuất lại")
+
+    chunks = []
+    for path, offset, _ in records:
+        if not chunks or chunks[-1][0] != path or len(chunks[-1][1]) >= chunk_size:
+            chunks.append((path, []))
+        chunks[-1][1].append(offset)
+
+    extracted = Counter()
+    failed = Counter()
+    lost = 0
+    workers = workers or os.cpu_count() or 1
+    with open(output_path, 'w', encoding='utf-8') as out, ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_replay_chunk, path, offsets): (path, offsets) for path, offsets in chunks}
+        with tqdm(total=len(records), desc="Trích xuất lại từ kho HTML") as progress:
+            for future in as_completed(futures):
+                try:
+                    results = future.result()
+                except Exception as e:
+                    # Một nhóm lỗi (tiến trình con chết, lỗi ngoài dự kiến) chỉ làm mất nhóm đó
+                    path, offsets = futures[future]
+                    logging.error(f"Lỗi khi trích xuất lại nhóm {len(offsets)} bản ghi của {path} "
+                                  f"(offset {offsets[0]}-{offsets[-1]}): {str(e)}")
+                    lost += len(offsets)
+                    progress.update(len(offsets))
+                    continue
+                for name, article in results:
+                    if article:
+                        out.write(json.dumps(article, ensure_ascii=False) + '\n')
+                        extracted[name] += 1
+                    else:
+                        failed[name] += 1
+                progress.update(len(results))
+
+    elapsed = time.time() - start_time
+    for name in sorted(set(extracted) | set(failed), key=str):
+        logging.info(f"Nguồn {name}: {extracted[name]} bài, {failed[name]} trang không trích xuất được")
+    if lost:
+        logging.warning(f"{lost} trang thuộc các nhóm bị lỗi không được trích xuất lại")
+    logging.info(f"Đã trích xuất lại {sum(extracted.values())}/{len(records)} trang trong {elapsed:.2f} giây "
+                 f"({len(records) / max(elapsed, 1e-9):.1f} trang/giây, {workers} tiến trình) -> {output_path}")
+    return extracted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Trích xuất lại bài viết từ kho HTML thô mà không tải lại trang")
+    parser.add_argument('archive_dir', help="Thư mục kho, ví dụ data_vtv/html_archive")
+    parser.add_argument('--output', default='replayed_articles.jsonl', help="File JSON Lines đầu ra")
+    parser.add_argument('--source', choices=list(SOURCES), default=None, help="Chỉ trích xuất lại một nguồn")
+    parser.add_argument('--workers', type=int, default=None, help="Số tiến trình (mặc định bằng số nhân CPU)")
+    parser.add_argument('--chunk-size', type=int, default=200, help="Số bản ghi mỗi tác vụ gửi cho tiến trình con")
+    args = parser.parse_args()
+
+    replay_archive(args.archive_dir, args.output, source=args.source, workers=args.workers,
+                   chunk_size=args.chunk_size)
@@ -0,0 +1,213 @@
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+
+# Kết quả phân loại một lần tải
+OK = 'ok'
+TRANSIENT = 'transient'
+PERMANENT = 'permanent'
+
+# 408/425/429 và 5xx là lỗi tạm thời của máy chủ, thử lại sau có thể thành công.
+# Các mã 4xx khác (404, 410, 403...) thử lại bao nhiêu lần cũng cho cùng kết quả.
+TRANSIENT_STATUS = {408, 425, 429, 500, 502, 503, 504, 520, 521, 522, 523, 524}
+
+
+class RetryPolicy:
+    """
+    Chính sách thử lại dùng chung cho một lần chạy:
+    - phân loại lỗi tạm thời (mất kết nối, timeout, 429, 5xx) và lỗi vĩnh viễn (404, 410...), chỉ thử lại lỗi tạm thời;
+    - thời gian chờ tăng theo cấp số nhân với jitter ngẫu nhiên để các request lỗi không dồn về cùng một thời điểm;
+    - ngân sách thử lại toàn cục: mỗi request mới nạp `budget_ratio` lượt, mỗi lần thử lại tiêu một lượt, nên khi
+      một host hỏng hàng loạt thì số request thử lại không vượt quá khoảng `budget_ratio` lần số request thật.
+    """
+
+    def __init__(self, max_attempts=4, base_delay=0.5, max_delay=30.0, budget_ratio=0.2, min_budget=10):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget_ratio = budget_ratio
+        self.min_budget = min_budget
+        self._budget = float(min_budget)
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.budget_exhausted = 0
+
+    @staticmethod
+    def classify(status_code=None, exc=None):
+        """Phân loại kết quả một request: OK, TRANSIENT hoặc PERMANENT"""
+        if exc is not None:
+            if isinstance(exc, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                                requests.exceptions.ChunkedEncodingError)):
+                return TRANSIENT
+            # URL sai, quá nhiều chuyển hướng...: tải lại cũng không khác
+            return PERMANENT
+        if status_code == 200:
+            return OK
+        if status_code in TRANSIENT_STATUS or status_code >= 500:
+            return TRANSIENT
+        return PERMANENT
+
+    def backoff(self, attempt, retry_after=None):
+        """
+        Số giây chờ trước lần thử thứ attempt + 1 ("full jitter": ngẫu nhiên trong [0, base * 2^attempt]).
+        Retry-After của máy chủ (dạng số giây) được tôn trọng nếu lớn hơn.
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if retry_after and str(retry_after).isdigit():
+            delay = max(delay, min(float(retry_after), self.max_delay * 4))
+        return delay
+
+    def record_request(self):
+        """Ghi nhận một request mới (không phải thử lại), nạp thêm ngân sách thử lại"""
+        with self._lock:
+            self._budget += self.budget_ratio
+
+    def allow_retry(self, attempt):
+        """Còn được thử lại sau lần thử thứ `attempt` (tính từ 1) hay không; nếu có thì tiêu một lượt ngân sách"""
+        if attempt >= self.max_attempts:
+            return False
+        with self._lock:
+            if self._budget < 1:
+                self.budget_exhausted += 1
+                return False
+            self._budget -= 1
+            self.retries += 1
+            return True
+
+    def call(self, send, url, circuit_breaker=None, **kwargs):
+        """
+        Gửi request đồng bộ send(url, **kwargs) theo chính sách: chờ khi host đang bị ngắt, thử lại lỗi tạm thời
+        với backoff. Trả về response cuối cùng (có thể là mã lỗi), hoặc ném lại lỗi kết nối của lần thử cuối.
+        Chỉ chặn luồng đang gọi, dùng cho trang danh sách vốn được tải tuần tự trong mỗi nguồn.
+        """
+        self.record_request()
+        attempt = 1
+        while True:
+            while circuit_breaker is not None:
+                if circuit_breaker.is_down(url):
+                    raise requests.exceptions.ConnectionError(f"Host của {url} đang sập, bỏ qua trong lần chạy này")
+                wait = circuit_breaker.wait_time(url)
+                if wait <= 0:
+                    break
+                time.sleep(wait)
+            try:
+                response = send(url, **kwargs)
+            except requests.exceptions.RequestException as e:
+                response, error = None, e
+                outcome = self.classify(exc=e)
+            else:
+                error = None
+                outcome = self.classify(response.status_code)
+            if circuit_breaker is not None:
+                if outcome == TRANSIENT:
+                    circuit_breaker.record_failure(url)
+                elif error is None:
+                    circuit_breaker.record_success(url)
+            if outcome != TRANSIENT or not self.allow_retry(attempt):
+                if error is not None:
+                    raise error
+                return response
+            retry_after = response.headers.get('Retry-After') if response is not None else None
+            delay = self.backoff(attempt, retry_after)
+            logging.warning(f"Lỗi tạm thời khi tải {url} (lần {attempt}/{self.max_attempts}), "
+                            f"thử lại sau {delay:.1f} giây")
+            time.sleep(delay)
+            attempt += 1
+
+    def stats(self):
+        with self._lock:
+            return {'retries': self.retries, 'budget_exhausted': self.budget_exhausted,
+                    'budget_left': round(self._budget, 1)}
+
+
+class CircuitBreaker:
+    """
+    Cầu dao theo host: sau `failure_threshold` lỗi tạm thời liên tiếp thì ngắt host trong `cooldown` giây,
+    các request tới host đó được gác lại thay vì tiếp tục dội vào một máy chủ đang sập. Hết thời gian ngắt,
+    một request thăm dò được đi qua (half-open): thành công thì đóng cầu dao, lỗi thì ngắt lại với thời gian dài gấp đôi.
+    Sau `max_trips` lần ngắt liên tiếp, host được coi là sập trong cả lần chạy: các liên kết còn lại của host bị bỏ qua
+    (vẫn chờ trong frontier cho lần chạy sau) thay vì chờ thêm.
+    """
+
+    def __init__(self, failure_threshold=5, cooldown=30.0, max_cooldown=600.0, max_trips=6):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.max_trips = max_trips
+        self._failures = {}
+        self._trips_in_row = {}
+        self._open_until = {}
+        self._current_cooldown = {}
+        self._probing = set()
+        self._lock = threading.Lock()
+        self.trips = 0
+
+    @staticmethod
+    def _host(url):
+        return urlparse(url).netloc or url
+
+    def wait_time(self, url):
+        """
+        Số giây còn phải chờ trước khi được gửi request tới host của url, 0 nếu được gửi ngay.
+        Khi cầu dao vừa hết thời gian ngắt, chỉ request đầu tiên được đi thăm dò, các request khác tiếp tục chờ.
+        """
+        host = self._host(url)
+        with self._lock:
+            open_until = self._open_until.get(host)
+            if open_until is None:
+                return 0.0
+            now = time.monotonic()
+            if now < open_until:
+                return open_until - now
+            if host in self._probing:
+                return min(1.0, self.cooldown)
+            self._probing.add(host)
+            return 0.0
+
+    def record_success(self, url):
+        """Host đã trả lời (kể cả 404): host còn sống"""
+        host = self._host(url)
+        with self._lock:
+            self._failures[host] = 0
+            self._trips_in_row[host] = 0
+            self._probing.discard(host)
+            if self._open_until.pop(host, None) is not None:
+                self._current_cooldown.pop(host, None)
+                logging.info(f"Host {host} đã hoạt động trở lại, đóng cầu dao")
+
+    def record_failure(self, url):
+        """Ghi nhận một lỗi tạm thời (mất kết nối, timeout, 5xx...) của host"""
+        host = self._host(url)
+        with self._lock:
+            self._failures[host] = self._failures.get(host, 0) + 1
+            probe_failed = host in self._probing
+            if not probe_failed and self._failures[host] < self.failure_threshold:
+                return
+            if probe_failed:
+                self._probing.discard(host)
+                cooldown = min(self.max_cooldown, self._current_cooldown.get(host, self.cooldown) * 2)
+            elif self._open_until.get(host, 0) > time.monotonic():
+                return  # Đã ngắt, các request đang bay về muộn không kéo dài thêm
+            else:
+                cooldown = self.cooldown
+            self._current_cooldown[host] = cooldown
+            self._open_until[host] = time.monotonic() + cooldown
+            self._failures[host] = 0
+            self._trips_in_row[host] = self._trips_in_row.get(host, 0) + 1
+            self.trips += 1
+            logging.warning(f"Ngắt cầu dao host {host} trong {cooldown:.0f} giây sau nhiều lỗi liên tiếp")
+
+    def is_down(self, url):
+        """Host đã bị ngắt `max_trips` lần liên tiếp mà không lần thăm dò nào thành công"""
+        with self._lock:
+            return self._trips_in_row.get(self._host(url), 0) >= self.max_trips
+
+    def open_hosts(self):
+        """Các host đang bị ngắt"""
+        now = time.monotonic()
+        with self._lock:
+            return [host for host, until in self._open_until.items() if until > now]
@@ -0,0 +1,99 @@
+import os
+from urllib.parse import urlparse
+
+import new_vneconomy
+import news_scraper
+import news_vtv
+
+
+class NewsSource:
+    """
+    Giao diện chung của một nguồn tin cho bộ lập lịch nhiều nguồn.
+    Mỗi nguồn bọc scraper riêng của nó và cung cấp: tìm liên kết (collect_links), trích xuất bài viết (extract),
+    tải các bài còn chờ (claim_articles) và quy tắc làm sạch (clean).
+    """
+
+    name = None
+    host = None
+    # Hàm cấp module extract(html, url, category), pickle được để chạy trong process pool
+    extract = None
+
+    def __init__(self, scraper):
+        self.scraper = scraper
+
+    def collect_links(self, num_pages, resume=True, incremental=False, use_sitemaps=False, since=None):
+        return self.scraper.collect_links(num_pages, resume=resume, incremental=incremental,
+                                          use_sitemaps=use_sitemaps, since=since)
+
+    def claim_articles(self, since=None):
+        self.scraper.claim_articles(since=since)
+
+    def pending_links(self, since=None):
+        return self.scraper.frontier.pending(self.name, since=since)
+
+    def clean(self, article):
+        return self.scraper.clean_article(article)
+
+    def preprocess(self, full=False):
+        return self.scraper.preprocess_data(full=full)
+
+    def commit(self):
+        self.scraper._flush_raw_store()
+        self.scraper.frontier.commit()
+
+
+class VtvSource(NewsSource):
+    name = 'vtv'
+    host = 'vtv.vn'
+    extract = staticmethod(news_vtv.extract_vtv_article)
+
+    def __init__(self, output_dir="data_vtv", **kwargs):
+        super().__init__(news_vtv.NewsScraperVTV(output_dir=output_dir, **kwargs))
+
+
+class VneconomySource(NewsSource):
+    name = 'vneconomy'
+    host = 'vneconomy.vn'
+    extract = staticmethod(new_vneconomy.extract_vneconomy_article)
+
+    def __init__(self, output_dir="data", **kwargs):
+        super().__init__(new_vneconomy.NewsScraperVietnam(output_dir=output_dir, **kwargs))
+
+
+class VietnamnetSource(NewsSource):
+    name = 'vietnamnet'
+    host = 'vietnamnet.vn'
+    extract = staticmethod(news_scraper.extract_vietnamnet_article)
+
+    def __init__(self, output_dir="data", **kwargs):
+        super().__init__(news_scraper.NewsScraperVietnam(output_dir=output_dir, **kwargs))
+
+    def clean(self, article):
+        return self.scraper._clean_article(article)
+
+
+SOURCES = {
+    'vtv': VtvSource,
+    'vneconomy': VneconomySource,
+    'vietnamnet': VietnamnetSource,
+}
+
+
+def create_sources(names=None, parse_workers=None, **kwargs):
+    """
+    Khởi tạo các nguồn theo tên (mặc định tất cả).
+    Số tiến trình phân tích HTML được chia đều giữa các nguồn vì các nguồn chạy đồng thời.
+    """
+    names = names or list(SOURCES)
+    if parse_workers is None:
+        parse_workers = max(1, (os.cpu_count() or 1) // len(names))
+    return [SOURCES[name](parse_workers=parse_workers, **kwargs) for name in names]
+
+
+def source_for_url(url):
+    """Tên nguồn sở hữu url, None nếu không thuộc nguồn nào"""
+    host = urlparse(url).netloc
+    for name, source_class in SOURCES.items():
+        if host == source_class.host or host.endswith(f".{source_class.host}"):
+            return name
+    return None
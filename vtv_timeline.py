@@ -0,0 +1,83 @@
+import logging
+import re
+
+from html_extract import make_soup
+
+# Trang "Xem thêm" của timeline chuyên mục VTV trả về một đoạn HTML danh sách bài, đánh số theo zone của chuyên mục
+TIMELINE_URL = "https://vtv.vn/timeline/{zone_id}/trang-{page}.htm"
+
+# Các cách trang chuyên mục khai báo mã zone (thuộc tính data-*, biến JavaScript)
+ZONE_ID_PATTERNS = [
+    re.compile(r'data-zone-?id\s*=\s*["\']?(\d+)', re.IGNORECASE),
+    re.compile(r'zone_?id["\']?\s*[:=]\s*["\']?(\d+)', re.IGNORECASE),
+    re.compile(r'/timeline/(\d+)/', re.IGNORECASE),
+]
+
+
+def find_zone_id(html):
+    """Tìm mã zone của chuyên mục trong HTML trang chuyên mục, trả về None nếu không thấy"""
+    for pattern in ZONE_ID_PATTERNS:
+        match = pattern.search(html)
+        if match:
+            return match.group(1)
+    return None
+
+
+def parse_timeline_links(html, base_url="https://vtv.vn"):
+    """
+    Lấy các liên kết bài viết .htm theo thứ tự hiển thị.
+    Trang chuyên mục đầy đủ chỉ lấy trong khối timeline; đoạn HTML của trang "Xem thêm" thì lấy toàn bộ.
+    """
+    soup = make_soup(html)
+    timeline = soup.find('div', class_='list_news timeline')
+    container = timeline if timeline is not None else soup
+    links = []
+    for a in container.find_all('a', href=True):
+        href = a['href'].split('#')[0]
+        if not href.endswith('.htm') or '/timeline/' in href:
+            continue
+        if not href.startswith('http'):
+            href = f"{base_url}{href}" if href.startswith('/') else f"{base_url}/{href}"
+        links.append(href)
+    return list(dict.fromkeys(links))
+
+
+class VtvTimelineFetcher:
+    """Thu thập liên kết timeline VTV bằng HTTP thuần: đọc trang chuyên mục rồi tải lần lượt các trang "Xem thêm"""
+
+    def __init__(self, get, timeline_url=TIMELINE_URL):
+        # get(url) -> requests.Response, thường là _get của scraper (đã qua rate limiter và cache)
+        self.get = get
+        self.timeline_url = timeline_url
+
+    def collect(self, category_html, max_pages=10, should_stop=None):
+        """
+        Trả về danh sách liên kết của chuyên mục, hoặc None nếu trang không có timeline đọc được bằng HTTP
+        (khi đó cần dùng trình duyệt).
+        Args:
+            category_html (str): HTML trang chuyên mục đã tải.
+            max_pages (int): Số trang timeline tối đa, tính cả trang chuyên mục.
+            should_stop (callable): Nhận danh sách liên kết vừa nạp, trả về True để ngừng tải thêm.
+        """
+        links = parse_timeline_links(category_html)
+        zone_id = find_zone_id(category_html)
+        if not links or zone_id is None:
+            return None
+
+        seen = set(links)
+        loaded = links
+        for page in range(2, max_pages + 1):
+            if should_stop is not None and should_stop(loaded):
+                break
+            url = self.timeline_url.format(zone_id=zone_id, page=page)
+            response = self.get(url)
+            if response.status_code != 200:
+                logging.warning(f"Không thể truy cập trang timeline {url}, mã trạng thái: {response.status_code}")
+                break
+            response.encoding = 'utf-8'
+            loaded = [href for href in parse_timeline_links(response.text) if href not in seen]
+            if not loaded:
+                break  # Hết bài trong timeline
+            seen.update(loaded)
+            links.extend(loaded)
+        return links